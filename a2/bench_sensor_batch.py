@@ -0,0 +1,41 @@
+# bench_sensor_batch.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Throughput of sensor_batch.decide_frames() on random coded frames, compared with deciding the
+# same frames one at a time through input_processing.decide() (on a smaller sample).
+#
+# Usage: python bench_sensor_batch.py [frames]
+
+import sys
+import time
+
+import numpy as np
+
+from input_processing import decide
+from sensor_batch import decide_frames, decision_names, detection_values, light_values
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000_000
+    rng = np.random.default_rng(0)
+    lights = rng.integers(0, len(light_values), frames, dtype=np.uint8)
+    pedestrians = rng.integers(0, len(detection_values), frames, dtype=np.uint8)
+    vehicles = rng.integers(0, len(detection_values), frames, dtype=np.uint8)
+
+    start = time.perf_counter()
+    decisions = decide_frames(lights, pedestrians, vehicles)
+    batch = time.perf_counter() - start
+    print(f"batch: {frames:>11} frames in {batch:7.3f} s, {frames / batch / 1e6:8.1f} M frames/s")
+
+    # The one frame at a time path is far slower, so time it on a sample and check it agrees
+    sample = min(frames, 100_000)
+    start = time.perf_counter()
+    single = [decide(light_values[l], detection_values[p], detection_values[v])
+              for l, p, v in zip(lights[:sample].tolist(), pedestrians[:sample].tolist(), vehicles[:sample].tolist())]
+    each = time.perf_counter() - start
+    print(f"single: {sample:>10} frames in {each:7.3f} s, {sample / each / 1e6:8.3f} M frames/s")
+    assert single == [decision_names[code] for code in decisions[:sample].tolist()]
+
+
+if __name__ == '__main__':
+    main()
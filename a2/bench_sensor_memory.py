@@ -0,0 +1,73 @@
+# bench_sensor_memory.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Memory taken by many sensor statuses: the original Sensor class (three strings in a __dict__),
+# the slotted, packed Sensor from input_processing.py and a SensorFleet array. Status strings are
+# built at run time like input() results, so the original class keeps its own copy of each.
+#
+# Usage: python bench_sensor_memory.py [sensors]
+
+import random
+import sys
+import tracemalloc
+
+from input_processing import Sensor
+from sensor_fleet import SensorFleet
+
+
+class DictSensor:
+    """
+    The Sensor class as it was before, with its status strings in a per instance __dict__.
+    """
+
+    def __init__(self):
+        self.traffic_light = "green"
+        self.pedestrian = "no"
+        self.vehicle = "no"
+
+
+def measure(build):
+    """
+    Measures the memory allocated by a function.
+
+    Args:
+        build (function): Builds and returns the sensors
+
+    Returns:
+        int: Bytes still allocated after the build
+    """
+    tracemalloc.start()
+    sensors = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sensors
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(0)
+    statuses = [(rng.choice(("green", "yellow", "red")), rng.choice(("yes", "no")), rng.choice(("yes", "no")))
+                for _ in range(count)]
+
+    def build(cls):
+        sensors = []
+        for light, pedestrian, vehicle in statuses:
+            sensor = cls()
+            # "".join makes new string objects, as input() would
+            sensor.traffic_light, sensor.pedestrian, sensor.vehicle = "".join(light), "".join(pedestrian), "".join(vehicle)
+            sensors.append(sensor)
+        return sensors
+
+    sizes = {
+        "dict Sensor (before)": measure(lambda: build(DictSensor)),
+        "slotted Sensor": measure(lambda: build(Sensor)),
+        "SensorFleet": measure(lambda: SensorFleet.from_sensors(build(Sensor))),
+    }
+    baseline = sizes["dict Sensor (before)"]
+    for name, size in sizes.items():
+        print(f"{name:>22}: {size / 2**20:9.2f} MiB  {size / count:7.1f} bytes/sensor  ({baseline / size:6.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# bench_sensor_stream.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Throughput benchmark of the sensor_stream.py engine on random detection events (1% invalid).
+# Measures process() (a decision for every status change) and run() (final decision only).
+# The target is at least 1M events per second.
+#
+# Usage: python bench_sensor_stream.py [events]
+
+import random
+import sys
+import time
+from collections import deque
+
+from sensor_stream import SensorStream
+
+valid_events = ([("light", value) for value in ("green", "yellow", "red")] +
+                [(field, value) for field in ("pedestrian", "vehicle") for value in ("yes", "no")] +
+                [("1", "green"), ("2", "no"), ("3", "yes")])
+
+
+def make_events(count, seed=0):
+    """
+    Builds random events.
+
+    Args:
+        count (int): Number of events
+        seed (int): Random seed
+
+    Returns:
+        list[tuple(str, str)]: Events
+    """
+    rng = random.Random(seed)
+    events = rng.choices(valid_events, k=count)
+    for i in rng.sample(range(count), count // 100):
+        events[i] = ("vehicle", "maybe")
+    return events
+
+
+def best_rate(function, events, runs=5):
+    """
+    Times a function over the events.
+
+    Args:
+        function (function): Takes the events
+        events (list): Events
+        runs (int): Number of runs
+
+    Returns:
+        float: Best events per second
+    """
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(events)
+        best = min(best, time.perf_counter() - start)
+    return len(events) / best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    events = make_events(count)
+    rates = {
+        # deque(maxlen=0) consumes the generator without keeping anything
+        "process (decision per change)": best_rate(lambda e: deque(SensorStream().process(e), maxlen=0), events),
+        "process (decision per event)": best_rate(lambda e: deque(SensorStream().process(e, True), maxlen=0), events),
+        "run (final decision)": best_rate(lambda e: SensorStream().run(e), events),
+    }
+    for name, rate in rates.items():
+        print(f"{name:>30}: {rate / 1e6:6.2f} M events/s {'' if rate >= 1e6 else '(below 1M target)'}")
+
+
+if __name__ == '__main__':
+    main()
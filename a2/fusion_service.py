@@ -0,0 +1,257 @@
+# fusion_service.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Asyncio service fusing the detections of many camera feeds into one course of action.
+#   * Each camera has a bounded input queue: a feed that gets ahead of processing waits in submit()
+#     (backpressure) instead of growing memory.
+#   * A camera's worker wakes on an event, waits out a short frame window and applies everything
+#     queued by then at once, so a burst of redundant updates produces one decision, not many.
+#   * Each camera keeps its own status (a SensorStream from sensor_stream.py, with the same
+#     validation). The fused decision is the most severe over all cameras: STOP if any feed
+#     demands it, otherwise Caution if any does, otherwise Proceed.
+#   * Every decision is published to the subscribers' queues, and the time from the oldest event
+#     it covers to publishing is kept for latency percentiles.
+#
+# Usage: python fusion_service.py [--cameras 8] [--events 5000] [--rate 2000] [--window-ms 5]
+#   runs simulated local feeds and prints the decisions and latency percentiles
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+
+from sensor_batch import decision_names
+from sensor_stream import SensorStream
+
+
+class FusionService:
+    """
+    Fuses camera feeds into one decision.
+
+    Variables:
+        cameras (dict): Camera name -> SensorStream with that camera's status
+        frame_window (float): Seconds a worker waits after an event for more to coalesce
+        latencies (deque[float]): Seconds from event to published decision, most recent last
+        published (int): Number of decisions published
+    """
+
+    def __init__(self, cameras, queue_size=64, frame_window=0.005, subscriber_size=256, latency_samples=100_000):
+        self.cameras = {camera: SensorStream() for camera in cameras}
+        self.frame_window = frame_window
+        self.latencies = deque(maxlen=latency_samples)
+        self.published = 0
+        self._queues = {camera: asyncio.Queue(queue_size) for camera in self.cameras}
+        self._subscribers = []
+        self._subscriber_size = subscriber_size
+        self._workers = []
+
+
+    async def submit(self, camera, field, value):
+        """
+        Queues a detection from a camera, waiting while the camera's queue is full.
+
+        Args:
+            camera (str): Camera name
+            field (str): Field, as accepted by SensorStream (e.g. "light" or "2")
+            value (str): New value, e.g. "red"
+        """
+        await self._queues[camera].put((time.perf_counter(), (field, value)))
+
+
+    def subscribe(self):
+        """
+        Registers a subscriber. Decisions are dictionaries with the fused "decision", the decision
+        of each camera ("cameras"), whether the fused decision "changed" and the "latency" in seconds.
+        A subscriber that falls behind loses its oldest decisions rather than slowing the service.
+
+        Returns:
+            asyncio.Queue: Queue the decisions are put on
+        """
+        queue = asyncio.Queue(self._subscriber_size)
+        self._subscribers.append(queue)
+        return queue
+
+
+    def unsubscribe(self, queue):
+        """
+        Stops publishing to a subscriber.
+
+        Args:
+            queue (asyncio.Queue): Queue from subscribe()
+        """
+        self._subscribers.remove(queue)
+
+
+    @property
+    def decision(self):
+        """
+        Fused decision over every camera.
+
+        Returns:
+            str: "Proceed", "Caution" or "STOP"
+        """
+        # Decision codes are ordered by severity, so the most severe is the highest
+        return decision_names[max(decision_names.index(stream.decision) for stream in self.cameras.values())]
+
+
+    def start(self):
+        """
+        Starts a worker task for every camera. Must be called from a running event loop.
+        """
+        self._workers = [asyncio.create_task(self._work(camera)) for camera in self.cameras]
+
+
+    async def stop(self, drain=True):
+        """
+        Stops the workers.
+
+        Args:
+            drain (bool): Process everything already queued first
+        """
+        if drain:
+            await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+    async def _work(self, camera):
+        """
+        Applies one camera's events a frame window at a time and publishes the fused decision.
+
+        Args:
+            camera (str): Camera name
+        """
+        queue = self._queues[camera]
+        stream = self.cameras[camera]
+        while True:
+            batch = [await queue.get()]
+            # Let the rest of the frame's updates arrive, then take everything queued
+            await asyncio.sleep(self.frame_window)
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            previous = self.decision
+            stream.run(event for _, event in batch)
+            self._publish(batch[0][0], previous)
+            for _ in batch:
+                queue.task_done()
+
+
+    def _publish(self, oldest, previous):
+        """
+        Sends the fused decision to every subscriber.
+
+        Args:
+            oldest (float): perf_counter() time of the oldest event the decision covers
+            previous (str): Fused decision before the events were applied
+        """
+        decision = self.decision
+        latency = time.perf_counter() - oldest
+        self.latencies.append(latency)
+        self.published += 1
+        message = {"decision": decision, "changed": decision != previous, "latency": latency,
+                   "cameras": {camera: stream.decision for camera, stream in self.cameras.items()}}
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+    def latency_percentiles(self, percentiles=(50, 90, 99, 99.9)):
+        """
+        Gets percentiles of the decision latency.
+
+        Args:
+            percentiles (tuple[float]): Percentiles to report
+
+        Returns:
+            dict: Percentile -> latency in milliseconds (empty if nothing was published yet)
+        """
+        if len(self.latencies) < 2:
+            return {}
+        cuts = statistics.quantiles(self.latencies, n=1000, method="inclusive")
+        return {p: cuts[min(len(cuts) - 1, max(0, round(p * 10) - 1))] * 1000 for p in percentiles}
+
+
+async def simulated_feed(service, camera, events, rate, seed):
+    """
+    Sends random detections from a camera at roughly the given rate.
+
+    Args:
+        service (FusionService): Service to send to
+        camera (str): Camera name
+        events (int): Number of events to send
+        rate (float): Events per second, 0 for as fast as possible
+        seed (int): Random seed
+    """
+    rng = random.Random(seed)
+    choices = [("light", "green")] * 6 + [("light", "yellow"), ("light", "red"), ("pedestrian", "yes"),
+                                          ("pedestrian", "no"), ("vehicle", "yes"), ("vehicle", "no")] * 2
+    start = time.perf_counter()
+    for i in range(events):
+        await service.submit(camera, *rng.choice(choices))
+        if rate:
+            # Sleep until this event's slot, so the feed keeps its rate on average
+            delay = start + (i + 1) / rate - time.perf_counter()
+            await asyncio.sleep(max(0, delay))
+
+
+async def simulate(cameras=8, events=5000, rate=2000, frame_window=0.005, seed=0):
+    """
+    Runs simulated feeds through a FusionService and prints a summary.
+
+    Args:
+        cameras (int): Number of camera feeds
+        events (int): Events per camera
+        rate (float): Events per second per camera, 0 for as fast as possible
+        frame_window (float): Coalescing window in seconds
+        seed (int): Random seed
+
+    Returns:
+        FusionService: The service, for inspection
+    """
+    service = FusionService([f"camera{i}" for i in range(cameras)], frame_window=frame_window)
+    decisions = service.subscribe()
+    counts = dict.fromkeys(decision_names, 0)
+
+    async def count_decisions():
+        while True:
+            message = await decisions.get()
+            if message["changed"]:
+                counts[message["decision"]] += 1
+
+    counter = asyncio.create_task(count_decisions())
+    service.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(simulated_feed(service, camera, events, rate, seed + i)
+                           for i, camera in enumerate(service.cameras)))
+    await service.stop()
+    elapsed = time.perf_counter() - start
+    # Let the counter take the last decisions
+    await asyncio.sleep(0)
+    counter.cancel()
+
+    total = cameras * events
+    print(f"{total} events from {cameras} cameras in {elapsed:.2f} s ({total / elapsed:,.0f} events/s), "
+          f"{service.published} decisions published")
+    print("Fused decision changes: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+    print("Latency: " + ", ".join(f"p{p:g} {ms:.2f} ms" for p, ms in service.latency_percentiles().items()))
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated multi-camera fusion run.")
+    parser.add_argument("--cameras", type=int, default=8)
+    parser.add_argument("--events", type=int, default=5000, help="Events per camera")
+    parser.add_argument("--rate", type=float, default=2000, help="Events per second per camera, 0 for unlimited")
+    parser.add_argument("--window-ms", type=float, default=5, help="Frame window for coalescing updates")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(simulate(args.cameras, args.events, args.rate, args.window_ms / 1000, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,85 @@
 
 # No global variables are permitted
 
+import argparse
+
+from sensor_batch import (Detection, Light, decision_names, decision_table, detection_values, light_values, pack_state,
+                          unpack_state)
+
 class Sensor:
+    """
+    Status of the traffic light, pedestrian and vehicle detections.
+
+    The whole status is kept as one small integer (see sensor_batch.pack_state) in a slot, so a
+    Sensor has no __dict__. The string attributes are properties: reading one returns the single
+    shared copy of the value, setting one validates it with a dict lookup.
+
+    Variables:
+        state (int): Packed status from 0 to 11
+        traffic_light (str): "green", "yellow" or "red"
+        pedestrian (str): "yes" or "no"
+        vehicle (str): "yes" or "no"
+    """
+
+    __slots__ = ("state",)
+
+    # Valid status values, also used to validate events in sensor_stream.py
+    light_options = light_values
+    detection_options = detection_values
 
     def __init__(self):
-        self.traffic_light = "green"
-        self.pedestrian = "no"
-        self.vehicle = "no"
+        self.state = pack_state(Light.green, Detection.no, Detection.no)
+
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Creates a sensor from a packed status.
+
+        Args:
+            state (int): Packed status from 0 to 11
+
+        Returns:
+            Sensor: The sensor
+        """
+        if not 0 <= state < len(light_values) * 4:
+            raise ValueError(f"Invalid packed status: {state}")
+        sensor = cls()
+        sensor.state = state
+        return sensor
+
+
+    @property
+    def traffic_light(self):
+        return light_values[self.state >> 2]
+
+
+    @traffic_light.setter
+    def traffic_light(self, status):
+        light, pedestrian, vehicle = unpack_state(self.state)
+        self.state = pack_state(code_of(Light, status), pedestrian, vehicle)
+
+
+    @property
+    def pedestrian(self):
+        return detection_values[self.state >> 1 & 1]
+
+
+    @pedestrian.setter
+    def pedestrian(self, status):
+        light, pedestrian, vehicle = unpack_state(self.state)
+        self.state = pack_state(light, code_of(Detection, status), vehicle)
+
+
+    @property
+    def vehicle(self):
+        return detection_values[self.state & 1]
+
+
+    @vehicle.setter
+    def vehicle(self, status):
+        light, pedestrian, vehicle = unpack_state(self.state)
+        self.state = pack_state(light, pedestrian, code_of(Detection, status))
 
     def update_status(self):
         """
@@ -49,7 +122,7 @@ class Sensor:
                 # Prompt user and get input
                 status = input("What change has been identified?: ")
                 # Only accepts "green", "yellow", or "red"
-                if status in ["green", "yellow", "red"]:
+                if status in Light.__members__:
                     self.traffic_light = status
                     break
                 # Invalid input raise an exception
@@ -72,7 +145,7 @@ class Sensor:
                 # prompt user and get input
                 status = input("What change has been identified?: ")
                 # Only accepts "yes" or "no" option
-                if status in ["yes", "no"]:
+                if status in Detection.__members__:
                     self.pedestrian = status
                     break
                 # Invalid input raise an exception
@@ -94,7 +167,7 @@ class Sensor:
                 # prompt user and get input
                 status = input("What change has been identified?: ")
                 # Only accepts "yes" or "no" option
-                if status in ["yes", "no"]:
+                if status in Detection.__members__:
                     self.vehicle = status
                     break
                 # Invalid input raise an exception
@@ -104,6 +177,48 @@ class Sensor:
                 print("Invalid vision change.")
 
 
+def code_of(codes, status):
+    """
+    Validates a status value and gets its code.
+
+    Args:
+        codes (IntEnum): Light or Detection
+        status (str): Status value, e.g. "green"
+
+    Raises:
+        ValueError: Invalid status value
+
+    Returns:
+        int: The value's code
+    """
+    try:
+        return codes[status]
+    except KeyError:
+        raise ValueError(f"Invalid vision change: {status!r}")
+
+
+def decide(traffic_light, pedestrian, vehicle):
+    """
+    Gets the course of action for a status. Looks the status up in the batch decision table of
+    sensor_batch.py directly (no arrays are built for one frame), shared by print_message and the
+    event stream engine (sensor_stream.py) so every path gives the same result.
+
+    Args:
+        traffic_light (str): "green", "yellow" or "red"
+        pedestrian (str): "yes" or "no"
+        vehicle (str): "yes" or "no"
+
+    Raises:
+        ValueError: Invalid status value
+
+    Returns:
+        str: "Proceed", "Caution" or "STOP"
+    """
+    # Look up the status in the table ("Proceed" for green, "Caution" for yellow, "STOP" if anything is detected)
+    decision = decision_table[code_of(Light, traffic_light), code_of(Detection, pedestrian), code_of(Detection, vehicle)]
+    return decision_names[decision]
+
+
 def print_message(sensor):
     """
     Checks current status of traffic light, pedestrian and vehicle and checks conditional logic to get
@@ -112,15 +227,8 @@ def print_message(sensor):
     Args:
         sensor (Sensor): Sensor object
     """
-    # Condition for "Proceed"
-    if sensor.traffic_light == "green" and sensor.pedestrian == "no" and sensor.pedestrian == "no":
-        message = "Proceed"
-    # Condition for "Caution"
-    elif sensor.traffic_light == "yellow" and sensor.pedestrian == "no" and sensor.vehicle == "no":
-        message = "Caution"
-    # All other conditions result in "STOP"
-    else:
-        message = "STOP"
+    # The packed status is already the sensor's position in the flattened table
+    message = decision_names[decision_table.flat[sensor.state]]
     
     # Print out info formatted to specifications
     print(f"\n{message}\n")
@@ -128,28 +236,43 @@ def print_message(sensor):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="ENSF 692 Car Vision Detector Processing Program")
+    parser.add_argument("--log", help="Binary log (see sensor_log.py) every status is appended to")
+    args = parser.parse_args()
+    # Imported here: sensor_log imports this module through sensor_stream
+    from sensor_log import SensorLogWriter
+    log = SensorLogWriter(args.log) if args.log else None
+
     print("\n***ENSF 692 Car Vision Detector Processing Program***\n")
     # Create sensor object
     sensor = Sensor()
-    # Wait infinitly for input
-    while True:
-        option = sensor.update_status()
-        # option 0: terminate the program
-        if option == 0:
-            break
-        # option 1: update traffic light
-        elif option == 1:
-            sensor.update_traffic_light()
-        # option 2: update pedestrian
-        elif option == 2:
-            sensor.update_pedestrian()
-        # option 3: update vehicle
-        elif option == 3:
-            sensor.update_vehicle()
+    # Close the log (writing what is buffered) however the program ends
+    try:
+        # Wait infinitly for input
+        while True:
+            previous_state = sensor.state
+            option = sensor.update_status()
+            # option 0: terminate the program
+            if option == 0:
+                break
+            # option 1: update traffic light
+            elif option == 1:
+                sensor.update_traffic_light()
+            # option 2: update pedestrian
+            elif option == 2:
+                sensor.update_pedestrian()
+            # option 3: update vehicle
+            elif option == 3:
+                sensor.update_vehicle()
         
-        # print out message
-        print_message(sensor)
+            # print out message
+            print_message(sensor)
+            # record the status if it changed, like sensor_log.py record does
+            if log and sensor.state != previous_state:
+                log.append(sensor.state)
+    finally:
+        if log:
+            log.close()
 
 if __name__ == '__main__':
     main()
-
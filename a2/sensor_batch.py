@@ -0,0 +1,205 @@
+# sensor_batch.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Batch evaluation of the Sensor decision logic for offline analysis of recorded drives. Frames are
+# given as columns of small integer codes (light 0-2, pedestrian and vehicle 0-1) and decided all
+# at once by indexing a precomputed 3x2x2 table of decisions, with no Python code run per frame.
+# input_processing.decide() and print_message() use the same table, so every path agrees.
+#
+# A whole status packs into one integer from 0 to 11 (light << 2 | pedestrian << 1 | vehicle),
+# which is how Sensor stores it and the index of the status in the flattened table.
+
+import enum
+
+import numpy as np
+
+
+class Light(enum.IntEnum):
+    """
+    Traffic light codes. Member names are the status strings, so Light["red"] validates and
+    converts a value with one dict lookup.
+    """
+    green = 0
+    yellow = 1
+    red = 2
+
+
+class Detection(enum.IntEnum):
+    """
+    Pedestrian and vehicle detection codes, named like Light.
+    """
+    no = 0
+    yes = 1
+
+
+# Status values in code order: a value's code is its position. These are the only copies of the
+# strings a Sensor ever hands out
+light_values = tuple(Light.__members__)
+detection_values = tuple(Detection.__members__)
+decision_names = ("Proceed", "Caution", "STOP")
+
+
+def pack_state(light, pedestrian, vehicle):
+    """
+    Packs a coded status into one integer. Works on single codes or on arrays of codes.
+
+    Args:
+        light (int): Light code
+        pedestrian (int): Pedestrian code
+        vehicle (int): Vehicle code
+
+    Returns:
+        int: Packed status from 0 to 11
+    """
+    return light << 2 | pedestrian << 1 | vehicle
+
+
+def unpack_state(state):
+    """
+    Splits a packed status into its codes. Works on single values or on arrays.
+
+    Args:
+        state (int): Packed status from pack_state()
+
+    Returns:
+        tuple(int, int, int): Light, pedestrian and vehicle codes
+    """
+    return state >> 2, state >> 1 & 1, state & 1
+
+
+def decision_rule(light, pedestrian, vehicle):
+    """
+    The course of action for one coded status, as given in the assignment specifications:
+    anything detected or a red light means STOP, otherwise green means Proceed and yellow Caution.
+
+    Args:
+        light (int): Light code
+        pedestrian (int): Pedestrian code
+        vehicle (int): Vehicle code
+
+    Returns:
+        int: Decision code, a position in decision_names
+    """
+    if light_values[light] == "red" or detection_values[pedestrian] == "yes" or detection_values[vehicle] == "yes":
+        return decision_names.index("STOP")
+    return decision_names.index("Proceed" if light_values[light] == "green" else "Caution")
+
+
+# decision_table[light, pedestrian, vehicle] -> decision code, worked out once from the rule
+decision_table = np.array([[[decision_rule(light, pedestrian, vehicle) for vehicle in range(len(detection_values))]
+                            for pedestrian in range(len(detection_values))] for light in range(len(light_values))],
+                          dtype=np.uint8)
+
+
+def as_codes(codes, count, name):
+    """
+    Checks a column of codes and converts it to uint8.
+
+    Args:
+        codes (array-like): Codes
+        count (int): Number of valid codes (valid codes are 0 to count - 1)
+        name (str): Column name for the error message
+
+    Raises:
+        ValueError: A code is out of range
+
+    Returns:
+        npArray[uint8]: The codes
+    """
+    codes = np.asarray(codes)
+    if codes.size and (codes.max() >= count or (codes.dtype.kind == "i" and codes.min() < 0)):
+        raise ValueError(f"{name} codes must be between 0 and {count - 1}.")
+    return codes.astype(np.uint8, copy=False)
+
+
+def encode(values, options, name):
+    """
+    Converts a column of status strings to codes.
+
+    Args:
+        values (array-like): Strings, e.g. "green"
+        options (tuple[str]): Valid values in code order
+        name (str): Column name for the error message
+
+    Raises:
+        ValueError: A value is not one of the options
+
+    Returns:
+        npArray[uint8]: Codes
+    """
+    values = np.asarray(values)
+    codes = np.full(values.shape, 255, dtype=np.uint8)
+    # One pass per option rather than one lookup per frame
+    for code, option in enumerate(options):
+        codes[values == option] = code
+    if (codes == 255).any():
+        raise ValueError(f"Invalid {name} value, must be one of: {', '.join(options)}.")
+    return codes
+
+
+def encode_frames(lights, pedestrians, vehicles):
+    """
+    Converts columns of status strings to code columns for decide_frames().
+
+    Args:
+        lights (array-like): "green", "yellow" or "red" for each frame
+        pedestrians (array-like): "yes" or "no" for each frame
+        vehicles (array-like): "yes" or "no" for each frame
+
+    Returns:
+        tuple(npArray, npArray, npArray): Light, pedestrian and vehicle codes
+    """
+    return (encode(lights, light_values, "light"), encode(pedestrians, detection_values, "pedestrian"),
+            encode(vehicles, detection_values, "vehicle"))
+
+
+def decide_frames(lights, pedestrians, vehicles):
+    """
+    Decides every frame at once.
+
+    Args:
+        lights (array-like): Light code of each frame
+        pedestrians (array-like): Pedestrian code of each frame
+        vehicles (array-like): Vehicle code of each frame
+
+    Raises:
+        ValueError: A code is out of range
+
+    Returns:
+        npArray[uint8]: Decision code of each frame, see decision_names
+    """
+    lights = as_codes(lights, len(light_values), "Light")
+    pedestrians = as_codes(pedestrians, len(detection_values), "Pedestrian")
+    vehicles = as_codes(vehicles, len(detection_values), "Vehicle")
+    # Index the flattened table with the packed status of each frame: cheaper than indexing with
+    # three arrays, and the packing stays in uint8 so no large temporary arrays are made
+    return decision_table.ravel()[pack_state(lights, pedestrians, vehicles)]
+
+
+def decide_states(states):
+    """
+    Decides every frame of a column of packed statuses.
+
+    Args:
+        states (array-like): Packed status of each frame, see pack_state()
+
+    Raises:
+        ValueError: A status is out of range
+
+    Returns:
+        npArray[uint8]: Decision code of each frame, see decision_names
+    """
+    return decision_table.ravel()[as_codes(states, decision_table.size, "Status")]
+
+
+def decision_labels(decisions):
+    """
+    Converts decision codes to their names.
+
+    Args:
+        decisions (array-like): Decision codes from decide_frames()
+
+    Returns:
+        npArray[str]: "Proceed", "Caution" or "STOP" for each frame
+    """
+    return np.array(decision_names)[np.asarray(decisions)]
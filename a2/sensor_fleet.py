@@ -0,0 +1,106 @@
+# sensor_fleet.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Statuses of a whole fleet of cameras in one NumPy array: each sensor is one byte holding its
+# packed status (see sensor_batch.pack_state), instead of one Sensor object per camera.
+
+import numpy as np
+
+from input_processing import Sensor
+from sensor_batch import Detection, Light, decide_states, decision_names, encode
+
+# Field -> (bit position in the packed status, bit mask, code enum)
+fields = {
+    "traffic_light": (2, 0b1100, Light),
+    "pedestrian": (1, 0b0010, Detection),
+    "vehicle": (0, 0b0001, Detection),
+}
+
+
+class SensorFleet:
+    """
+    Packed statuses of many sensors.
+
+    Variables:
+        states (npArray[uint8]): Packed status of each sensor
+    """
+
+    def __init__(self, size):
+        # Every sensor starts at the Sensor defaults
+        self.states = np.full(size, Sensor().state, dtype=np.uint8)
+
+
+    @classmethod
+    def from_sensors(cls, sensors):
+        """
+        Creates a fleet holding the statuses of Sensor objects.
+
+        Args:
+            sensors (list[Sensor]): Sensors
+
+        Returns:
+            SensorFleet: The fleet
+        """
+        fleet = cls(0)
+        fleet.states = np.fromiter((sensor.state for sensor in sensors), dtype=np.uint8, count=len(sensors))
+        return fleet
+
+
+    def __len__(self):
+        return len(self.states)
+
+
+    def sensor(self, index):
+        """
+        Gets one sensor's status as a Sensor object (a copy, changing it does not change the fleet).
+
+        Args:
+            index (int): Sensor position
+
+        Returns:
+            Sensor: The sensor
+        """
+        return Sensor.from_state(int(self.states[index]))
+
+
+    def update(self, indices, field, values):
+        """
+        Sets one field of many sensors at once.
+
+        Args:
+            indices (int, slice or array-like): Sensors to update
+            field (str): "traffic_light", "pedestrian" or "vehicle"
+            values (str or array-like): New value, e.g. "red", or one per sensor
+
+        Raises:
+            ValueError: Invalid field or value
+        """
+        if field not in fields:
+            raise ValueError(f"Field must be one of: {', '.join(fields)}.")
+        shift, mask, codes = fields[field]
+        values = encode(values, tuple(codes.__members__), field)
+        self.states[indices] = self.states[indices] & np.uint8(~mask & 0xFF) | values << np.uint8(shift)
+
+
+    def decisions(self, indices=slice(None)):
+        """
+        Decides every sensor (or the selected ones) at once.
+
+        Args:
+            indices (int, slice or array-like): Sensors to decide, all by default
+
+        Returns:
+            npArray[uint8]: Decision code of each sensor, see sensor_batch.decision_names
+        """
+        return decide_states(self.states[indices])
+
+
+    def decision_counts(self):
+        """
+        Counts the sensors with each decision.
+
+        Returns:
+            dict: Decision name -> number of sensors
+        """
+        counts = np.bincount(self.decisions(), minlength=len(decision_names))
+        return dict(zip(decision_names, counts.tolist()))
@@ -0,0 +1,229 @@
+# sensor_log.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Compact binary log of Sensor status transitions, for recording drives and replaying them
+# through the decision logic later.
+#
+# A log is a 16 byte header (magic, version, record size) followed by fixed-width 10 byte records:
+#   time (int64, ns since the epoch), state (uint8, packed status, see sensor_batch.pack_state),
+#   decision (uint8, decision code at the time it was recorded)
+# Appends are buffered and written in blocks. Replays memory-map the records and decide the
+# recorded statuses in large vectorized chunks, so days of traffic are checked in seconds.
+#
+# Usage:
+#   python sensor_log.py record events.txt drive.slog   record a file of events (see sensor_stream.py)
+#   python sensor_log.py replay drive.slog              replay a log, reporting changed decisions
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from sensor_batch import decide_states, decision_names, decision_table
+from sensor_stream import SensorStream, read_events, state_values
+
+magic = b"SENSLOG\0"
+version = 1
+header_format = struct.Struct("<8sHH4x")
+record_format = struct.Struct("<qBB")
+record_dtype = np.dtype([("time", "<i8"), ("state", "u1"), ("decision", "u1")])
+
+# Decision code of every packed status, for recording without going through NumPy per record
+state_decisions = decision_table.ravel().tolist()
+
+
+class SensorLogWriter:
+    """
+    Appends records to a log, creating it if needed. Records are kept in memory and written once
+    buffer_records have built up, when flush() is called, or when the writer is closed.
+
+    Variables:
+        path (str): Path of the log
+        buffer_records (int): Number of records buffered before writing
+    """
+
+    def __init__(self, path, buffer_records=4096):
+        self.path = path
+        self.buffer_records = buffer_records
+        self._buffer = bytearray()
+        self._file = open(path, "ab")
+        try:
+            size = self._file.tell()
+            if size == 0:
+                self._file.write(header_format.pack(magic, version, record_format.size))
+            else:
+                check_header(path)
+                # A crash can leave a partly written last record: drop it, or every record appended
+                # after it would be misaligned
+                aligned = header_format.size + (size - header_format.size) // record_format.size * record_format.size
+                if aligned != size:
+                    self._file.truncate(aligned)
+        except Exception:
+            # Not a sensor log (or unreadable): don't leave the file open
+            self._file.close()
+            raise
+
+
+    def append(self, state, decision=None, timestamp=None):
+        """
+        Records one status.
+
+        Args:
+            state (int): Packed status, e.g. Sensor.state
+            decision (int): Decision code, worked out from the status if not given
+            timestamp (int): Time in ns since the epoch, now if not given
+        """
+        self._buffer += record_format.pack(time.time_ns() if timestamp is None else timestamp, state,
+                                           state_decisions[state] if decision is None else decision)
+        if len(self._buffer) >= self.buffer_records * record_format.size:
+            self.flush()
+
+
+    def append_many(self, states, decisions=None, timestamps=None):
+        """
+        Records many statuses at once.
+
+        Args:
+            states (array-like): Packed statuses
+            decisions (array-like): Decision codes, worked out from the statuses if not given
+            timestamps (array-like): Times in ns since the epoch, now for every record if not given
+        """
+        states = np.asarray(states, dtype=np.uint8)
+        records = np.empty(len(states), dtype=record_dtype)
+        records["time"] = time.time_ns() if timestamps is None else timestamps
+        records["state"] = states
+        records["decision"] = decide_states(states) if decisions is None else decisions
+        self.flush()
+        self._file.write(records.tobytes())
+
+
+    def flush(self):
+        """
+        Writes the buffered records.
+        """
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+
+
+    def close(self):
+        """
+        Writes the buffered records and closes the log.
+        """
+        self.flush()
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def check_header(path):
+    """
+    Checks that a file is a sensor log this version can read.
+
+    Args:
+        path (str): Path of the log
+
+    Raises:
+        ValueError: Not a sensor log, or an unsupported version
+    """
+    with open(path, "rb") as f:
+        header = f.read(header_format.size)
+    if len(header) < header_format.size:
+        raise ValueError(f"{path} is not a sensor log.")
+    file_magic, file_version, record_size = header_format.unpack(header)
+    if file_magic != magic or record_size != record_format.size:
+        raise ValueError(f"{path} is not a sensor log.")
+    if file_version != version:
+        raise ValueError(f"{path} is a version {file_version} sensor log, only version {version} is supported.")
+
+
+def read_log(path):
+    """
+    Opens a log's records as a read-only memory map. Nothing is read until the records are used.
+    A partly written last record (e.g. after a crash) is left out.
+
+    Args:
+        path (str): Path of the log
+
+    Returns:
+        npArray: Records with time, state and decision fields
+    """
+    check_header(path)
+    count = (os.path.getsize(path) - header_format.size) // record_format.size
+    if count == 0:
+        return np.empty(0, dtype=record_dtype)
+    return np.memmap(path, dtype=record_dtype, mode="r", offset=header_format.size, shape=(count,))
+
+
+def replay(path, decide=decide_states, chunk_records=8_000_000):
+    """
+    Runs a log's statuses through the decision logic and compares with the recorded decisions.
+
+    Args:
+        path (str): Path of the log
+        decide (function): Decision logic taking an array of packed statuses and returning decision
+            codes, the current logic by default (pass a changed version to see what it would change)
+        chunk_records (int): Records decided at a time, bounding memory use
+
+    Returns:
+        dict: "records", "counts" (decision name -> records with that new decision) and "changed"
+            (positions of records whose decision differs from the recorded one)
+    """
+    records = read_log(path)
+    counts = np.zeros(len(decision_names), dtype=np.int64)
+    changed = []
+    for start in range(0, len(records), chunk_records):
+        chunk = records[start:start + chunk_records]
+        decisions = decide(chunk["state"])
+        counts += np.bincount(decisions, minlength=len(decision_names))
+        changed.append(np.flatnonzero(decisions != chunk["decision"]) + start)
+    return {"records": len(records), "counts": dict(zip(decision_names, counts.tolist())),
+            "changed": np.concatenate(changed) if changed else np.empty(0, dtype=np.int64)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay binary sensor logs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Record the status transitions of a file of events")
+    record.add_argument("events", help="Events file, - for stdin")
+    record.add_argument("log", help="Log to append to")
+    replay_command = commands.add_parser("replay", help="Replay a log through the decision logic")
+    replay_command.add_argument("log")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        stream = SensorStream()
+        f = sys.stdin if args.events == "-" else open(args.events)
+        with f, SensorLogWriter(args.log) as writer:
+            for _, state, _ in stream.process(read_events(f)):
+                writer.append(state)
+        print(f"Recorded to {args.log}, {stream.invalid} invalid events skipped.")
+    else:
+        start = time.perf_counter()
+        result = replay(args.log)
+        elapsed = time.perf_counter() - start
+        print(f"{result['records']} records replayed in {elapsed:.3f} s: " +
+              ", ".join(f"{name} {count}" for name, count in result["counts"].items()))
+        records = read_log(args.log)
+        for position in result["changed"][:10]:
+            light, pedestrian, vehicle = state_values(int(records["state"][position]))
+            print(f"Changed at record {position}: {decision_names[records['decision'][position]]} -> "
+                  f"{decision_names[decide_states(records['state'][position:position + 1])[0]]} "
+                  f"(Light = {light} , Pedestrian = {pedestrian} , Vehicle = {vehicle})")
+        if len(result["changed"]):
+            print(f"{len(result['changed'])} decisions changed.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# sensor_stream.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Non-interactive engine for the Sensor decision logic in input_processing.py. Instead of prompting,
+# it consumes (field, value) detection events, e.g. recorded vision output, validates them the same
+# way the prompts do and emits the Proceed/Caution/STOP decision whenever the status changes.
+#
+# There are only 12 possible statuses (3 lights x pedestrian yes/no x vehicle yes/no), so every
+# transition and decision is worked out once up front. Handling an event is then a single dict
+# lookup, which is what lets the engine run at millions of events per second in pure Python.
+#
+# Usage: python sensor_stream.py [events.txt] [--every] [--strict]
+#   events are read from the file (or stdin), one "field value" or "field,value" per line
+
+import argparse
+import sys
+
+from input_processing import Sensor, code_of, decide
+from sensor_batch import Detection, Light, pack_state, unpack_state
+
+# Names a field may be given as in an event: the menu option, a short name or the Sensor attribute
+field_names = {
+    "traffic_light": ("1", 1, "light", "traffic_light"),
+    "pedestrian": ("2", 2, "pedestrian"),
+    "vehicle": ("3", 3, "vehicle"),
+}
+
+
+def state_code(traffic_light, pedestrian, vehicle):
+    """
+    Numbers a status from 0 to 11, the same packed status Sensor stores.
+
+    Args:
+        traffic_light (str): "green", "yellow" or "red"
+        pedestrian (str): "yes" or "no"
+        vehicle (str): "yes" or "no"
+
+    Returns:
+        int: Status code
+    """
+    return pack_state(code_of(Light, traffic_light), code_of(Detection, pedestrian), code_of(Detection, vehicle))
+
+
+def state_values(code):
+    """
+    Gets the status a code stands for.
+
+    Args:
+        code (int): Status code from state_code()
+
+    Returns:
+        tuple(str, str, str): Traffic light, pedestrian and vehicle
+    """
+    light, pedestrian, vehicle = unpack_state(code)
+    return Sensor.light_options[light], Sensor.detection_options[pedestrian], Sensor.detection_options[vehicle]
+
+
+def build_transitions():
+    """
+    Works out the next status for every status and valid event.
+
+    Returns:
+        list[dict]: For each status code, a dict from (field, value) event to the next status code
+    """
+    transitions = []
+    for code in range(len(Sensor.light_options) * 4):
+        status = dict(zip(field_names, state_values(code)))
+        table = {}
+        for field, names in field_names.items():
+            options = Sensor.light_options if field == "traffic_light" else Sensor.detection_options
+            for value in options:
+                next_code = state_code(**{**status, field: value})
+                for name in names:
+                    table[name, value] = next_code
+        transitions.append(table)
+    return transitions
+
+
+class SensorStream:
+    """
+    Feeds detection events through the Sensor decision logic.
+
+    Variables:
+        state (int): Current status code, starts at the Sensor defaults (green, no, no)
+        invalid (int): Number of invalid events skipped
+        strict (bool): Raise ValueError on an invalid event instead of skipping it
+    """
+
+    # Shared by every stream, they never change
+    transitions = build_transitions()
+    decisions = [decide(*state_values(code)) for code in range(len(transitions))]
+
+    def __init__(self, strict=False):
+        self.state = Sensor().state
+        self.invalid = 0
+        self.strict = strict
+
+
+    @property
+    def status(self):
+        """
+        Current status.
+
+        Returns:
+            tuple(str, str, str): Traffic light, pedestrian and vehicle
+        """
+        return state_values(self.state)
+
+
+    @property
+    def decision(self):
+        """
+        Current course of action.
+
+        Returns:
+            str: "Proceed", "Caution" or "STOP"
+        """
+        return self.decisions[self.state]
+
+
+    def process(self, events, every=False):
+        """
+        Applies events in order, yielding the decision after each one that changes the status.
+
+        Args:
+            events (iterable): (field, value) events, the field being a menu option, a short name
+                ("light", "pedestrian", "vehicle") or a Sensor attribute name
+            every (bool): Also yield for valid events that leave the status unchanged, like the
+                interactive program which prints after every update
+
+        Raises:
+            ValueError: An event is invalid and strict is set
+
+        Yields:
+            tuple(int, int, str): Position of the event, the status code and the decision after it
+        """
+        transitions = self.transitions
+        decisions = self.decisions
+        state = self.state
+        try:
+            for position, event in enumerate(events):
+                next_state = transitions[state].get(event)
+                if next_state is None:
+                    if self.strict:
+                        raise ValueError(f"Invalid vision change at event {position}: {event!r}")
+                    self.invalid += 1
+                elif next_state != state or every:
+                    state = next_state
+                    yield position, state, decisions[state]
+        finally:
+            # Keep the status if the caller stops early
+            self.state = state
+
+
+    def run(self, events):
+        """
+        Applies every event without producing decisions along the way, the fastest way to replay.
+
+        Args:
+            events (iterable): (field, value) events, see process()
+
+        Returns:
+            str: Decision after the last event
+        """
+        transitions = self.transitions
+        state = self.state
+        for event in events:
+            next_state = transitions[state].get(event)
+            if next_state is not None:
+                state = next_state
+            elif self.strict:
+                raise ValueError(f"Invalid vision change: {event!r}")
+            else:
+                self.invalid += 1
+        self.state = state
+        return self.decisions[state]
+
+
+def read_events(lines):
+    """
+    Parses events from text lines, "field value" or "field,value". Blank lines are skipped.
+
+    Args:
+        lines (iterable[str]): Lines, e.g. an open file
+
+    Yields:
+        tuple(str, str): Field and value
+    """
+    for line in lines:
+        parts = line.replace(",", " ").split()
+        if parts:
+            yield tuple(parts) if len(parts) == 2 else (line.strip(), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay detection events through the Sensor decision logic.")
+    parser.add_argument("file", nargs="?", help="File of events, stdin if left out")
+    parser.add_argument("--every", action="store_true", help="Print a decision after every valid event")
+    parser.add_argument("--strict", action="store_true", help="Stop at the first invalid event")
+    args = parser.parse_args()
+
+    stream = SensorStream(args.strict)
+    f = open(args.file) if args.file else sys.stdin
+    with f:
+        try:
+            for position, state, decision in stream.process(read_events(f), args.every):
+                light, pedestrian, vehicle = state_values(state)
+                print(f"{position} {decision} Light = {light} , Pedestrian = {pedestrian} , Vehicle = {vehicle} .")
+        except ValueError as e:
+            sys.exit(str(e))
+    if stream.invalid:
+        print(f"{stream.invalid} invalid events skipped.", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
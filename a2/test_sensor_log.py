@@ -0,0 +1,47 @@
+# test_sensor_log.py
+# Aidan MacNichol, ENSF 692 P24
+#
+# Tests for sensor_log.py. Run with: python -m pytest test_sensor_log.py
+
+import pytest
+
+from sensor_log import SensorLogWriter, header_format, read_log, record_format, replay
+
+
+def test_append_and_replay(tmp_path):
+    path = str(tmp_path / "drive.slog")
+    with SensorLogWriter(path, buffer_records=2) as writer:
+        for state in (0, 4, 8, 1):
+            writer.append(state, timestamp=state)
+    records = read_log(path)
+    assert records["state"].tolist() == [0, 4, 8, 1]
+    assert records["time"].tolist() == [0, 4, 8, 1]
+    result = replay(path)
+    assert result["counts"] == {"Proceed": 1, "Caution": 1, "STOP": 2}
+    assert len(result["changed"]) == 0
+
+
+def test_reopen_after_torn_record(tmp_path):
+    path = str(tmp_path / "drive.slog")
+    with SensorLogWriter(path) as writer:
+        writer.append(1, timestamp=10)
+    # A crash in the middle of writing a record
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    with SensorLogWriter(path) as writer:
+        writer.append(2, timestamp=20)
+        writer.append(3, timestamp=30)
+    records = read_log(path)
+    assert records["time"].tolist() == [10, 20, 30]
+    assert records["state"].tolist() == [1, 2, 3]
+    assert (tmp_path / "drive.slog").stat().st_size == header_format.size + 3 * record_format.size
+
+
+# A leaked file handle shows up as a ResourceWarning
+@pytest.mark.filterwarnings("error")
+def test_reject_other_file(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a sensor log at all")
+    with pytest.raises(ValueError):
+        SensorLogWriter(str(path))
+    assert path.read_bytes() == b"not a sensor log at all"
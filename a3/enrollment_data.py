@@ -0,0 +1,228 @@
+# enrollment_data.py
+# Aidan MacNichol
+#
+# Builds the (year, school, grade) enrollment cube used by school_data.py straight from an
+# enrollment file laid out like Assignment3Data.csv (one row per school per year). Schools and years
+# are inferred from the file, the file is parsed in chunks with pandas' C parser, and the cube is
+# filled with one vectorized scatter, so there is no Python loop per row.
+#
+# The cube can also be saved once in a compact memory-mapped .npy format (save_cube) and reopened
+# by later runs in near-constant time (open_cube).
+
+import json
+import os
+
+
+# Default layout of the City of Calgary enrollment files
+year_column = "School Year"
+name_column = "School Name"
+code_column = "School Code"
+grade_columns = ("Grade 10", "Grade 11", "Grade 12")
+
+
+def load_enrollment_csv(file_path, grades=grade_columns, chunksize=1_000_000):
+    """
+    Loads an enrollment csv file into a 3D array with shape (year, school, grade).
+    Year/school/grade combinations missing from the file are NaN. Schools are ordered by ascending
+    numerical school code, years ascending. A school year like "2019-2020" counts as 2019.
+
+    Args:
+        file_path (str): Path of the csv file
+        grades (tuple[str]): Names of the grade columns, in cube order
+        chunksize (int): Number of rows parsed at a time
+
+    Raises:
+        ValueError: The file is missing one of the expected columns
+
+    Returns:
+        tuple(npArray, npArray, npArray, npArray): years, school codes, school names and the data cube
+    """
+    # NumPy and pandas are imported where they are used, so importing this module stays cheap
+    import numpy as np
+    import pandas as pd
+
+    columns = [year_column, name_column, code_column, *grades]
+    # Each chunk is reduced to small arrays before the next one is parsed: year, school id and grade
+    # values per row, plus every school's latest name and the row it was last seen on
+    school_ids = {}
+    school_names = {}
+    last_seen = {}
+    year_parts, school_parts, value_parts = [], [], []
+    row_count = 0
+    try:
+        reader = pd.read_csv(file_path, usecols=columns, chunksize=chunksize, engine="c", encoding="utf-8-sig",
+                             dtype={year_column: str, name_column: str, code_column: str})
+
+        for chunk in reader:
+            # Keep only the leading year of values like "2019-2020"
+            chunk[year_column] = pd.to_numeric(chunk[year_column].str.strip().str[:4], errors="coerce")
+            chunk[code_column] = chunk[code_column].str.strip()
+            chunk = chunk.dropna(subset=[year_column, code_column])
+            # Schools get ids in the order they are first seen
+            local_ids, local_codes = pd.factorize(chunk[code_column])
+            ids = np.array([school_ids.setdefault(code, len(school_ids)) for code in local_codes], dtype=np.intp)
+            latest = ~chunk[code_column].duplicated(keep="last").to_numpy()
+            for code, name, row in zip(chunk[code_column][latest], chunk[name_column][latest], np.flatnonzero(latest)):
+                school_names[school_ids[code]] = name
+                last_seen[school_ids[code]] = row_count + row
+            row_count += len(chunk)
+            year_parts.append(chunk[year_column].to_numpy(dtype=np.int64))
+            school_parts.append(ids[local_ids])
+            value_parts.append(chunk[list(grades)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float))
+    except ValueError as e:
+        raise ValueError(f"{file_path} is not a valid enrollment file: {e}")
+    if not year_parts:
+        raise ValueError(f"{file_path} is not a valid enrollment file: it has no rows")
+
+    # Infer the axes: sorted unique years, and schools sorted by numerical code (ties by last appearance)
+    years, year_index = np.unique(np.concatenate(year_parts), return_inverse=True)
+    ids = np.arange(len(school_ids))
+    codes = np.array(list(school_ids), dtype=str)
+    numeric_codes = pd.to_numeric(pd.Series(codes), errors="coerce").to_numpy()
+    order = np.lexsort((np.array([last_seen[i] for i in ids]), numeric_codes))
+    codes = codes[order]
+    names = np.char.strip(np.array([str(school_names[i]) for i in order], dtype=str))
+    # Position of every school id along the school axis
+    position = np.empty(len(order), dtype=np.intp)
+    position[order] = ids
+    school_index = position[np.concatenate(school_parts)]
+
+    # Scatter every row into its (year, school) cell in one go, later rows win on duplicates
+    data = np.full((len(years), len(codes), len(grades)), np.nan)
+    data[year_index, school_index, :] = np.concatenate(value_parts)
+    return years, codes, names, data
+
+
+def smallest_dtype(data):
+    """
+    Picks the smallest integer dtype that holds every enrollment and still has a spare value to mark
+    missing (NaN) cells. Falls back to float32/float64 if the data has fractional values.
+
+    Args:
+        data (npArray): Enrollment data, NaN for missing
+
+    Returns:
+        tuple(dtype, number): The dtype and the sentinel stored for missing cells (NaN for float dtypes)
+    """
+    import numpy as np
+    values = data[~np.isnan(data)]
+    if values.size and not np.array_equal(values, np.round(values)):
+        dtype = np.float32 if np.array_equal(values, values.astype(np.float32)) else np.float64
+        return np.dtype(dtype), np.nan
+    low = values.min() if values.size else 0
+    high = values.max() if values.size else 0
+    # Unsigned types use their maximum as the sentinel, signed ones their minimum
+    candidates = (np.uint8, np.uint16, np.uint32, np.uint64) if low >= 0 else (np.int8, np.int16, np.int32, np.int64)
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if low >= 0 and high < info.max:
+            return np.dtype(dtype), info.max
+        if low < 0 and low > info.min and high <= info.max:
+            return np.dtype(dtype), info.min
+    return np.dtype(np.float64), np.nan
+
+
+def source_key(file_path):
+    """
+    Identifies a version of a source csv file, for checking that a saved cube was built from it.
+
+    Args:
+        file_path (str): Path of the csv file
+
+    Returns:
+        dict: Absolute path, size and modification time (ns) of the file
+    """
+    stat = os.stat(file_path)
+    return {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cube_source(file_path):
+    """
+    Reads which source file a saved cube was built from.
+
+    Args:
+        file_path (str): Path of the .npy file
+
+    Raises:
+        OSError: The cube or its .json sidecar is missing
+        ValueError: The sidecar is not valid JSON
+
+    Returns:
+        dict: source_key() of the csv the cube was saved from, None if it was not saved from a csv
+    """
+    # The cube itself must exist too, a sidecar on its own is not a usable cache
+    os.stat(file_path)
+    with open(file_path + ".json") as f:
+        return json.load(f).get("source")
+
+
+def save_cube(file_path, years, codes, names, data, source=None):
+    """
+    Saves the enrollment cube as a compact .npy file plus a .json sidecar with the years, schools and
+    missing value sentinel. The cube is stored school by school (shape (school, year, grade)) so that
+    reading one school's data only touches that school's pages when the file is memory-mapped.
+
+    Args:
+        file_path (str): Path of the .npy file to write
+        years (npArray): Year of each entry along the first axis of data
+        codes (npArray): School codes
+        names (npArray): School names
+        data (npArray): Enrollment data with shape (year, school, grade), NaN for missing
+        source (dict): source_key() of the csv the data was loaded from, None if not from a csv
+    """
+    import numpy as np
+    dtype, sentinel = smallest_dtype(data)
+    school_major = data.transpose(1, 0, 2)
+    # Write to temporary files and rename, so a reader never sees a half written cube
+    out = np.lib.format.open_memmap(file_path + ".tmp", mode="w+", dtype=dtype, shape=school_major.shape)
+    if np.isnan(sentinel):
+        out[...] = school_major
+    else:
+        out[...] = np.where(np.isnan(school_major), sentinel, school_major)
+    out.flush()
+    del out
+    metadata = {"years": [int(year) for year in years], "codes": [str(code) for code in codes],
+                "names": [str(name) for name in names], "sentinel": None if np.isnan(sentinel) else int(sentinel),
+                "layout": ["school", "year", "grade"], "source": source}
+    with open(file_path + ".json.tmp", "w") as f:
+        json.dump(metadata, f)
+    os.replace(file_path + ".tmp", file_path)
+    os.replace(file_path + ".json.tmp", file_path + ".json")
+
+
+def open_cube(file_path):
+    """
+    Opens a cube written by save_cube() as a read-only memory map. Nothing is read from disk until
+    the returned array is indexed.
+
+    Args:
+        file_path (str): Path of the .npy file
+
+    Returns:
+        tuple(npArray, npArray, npArray, npArray, number): years, school codes, school names, the raw
+            cube as a (year, school, grade) view of the memory map, and the missing value sentinel (None for floats)
+    """
+    import numpy as np
+    with open(file_path + ".json") as f:
+        metadata = json.load(f)
+    raw = np.load(file_path, mmap_mode="r").transpose(1, 0, 2)
+    return (np.array(metadata["years"]), np.array(metadata["codes"]), np.array(metadata["names"]), raw,
+            metadata["sentinel"])
+
+
+def decode(raw, sentinel):
+    """
+    Converts part of a raw cube back to floats with NaN for missing cells.
+
+    Args:
+        raw (npArray): Slice of the raw (memory-mapped) cube
+        sentinel (int): Missing value sentinel, None if the cube is stored as floats
+
+    Returns:
+        npArray: Float copy of the slice
+    """
+    import numpy as np
+    values = np.asarray(raw, dtype=float)
+    if sentinel is not None:
+        values[raw == sentinel] = np.nan
+    return values
@@ -7,23 +7,71 @@
 # Remember to include docstrings and comments.
 
 
-import numpy as np
-from given_data import year_2013, year_2014, year_2015, year_2016, year_2017, year_2018, year_2019, year_2020, year_2021, year_2022
+import argparse
+import bisect
+import csv
+import difflib
+import json
+import sys
+import warnings
+# NumPy and the given data are imported inside the functions that use them, so importing this module is cheap
+from enrollment_data import load_enrollment_csv, save_cube, open_cube, decode, source_key, cube_source
 
 # (year, school, grade)
 
+def count_text(value):
+    """
+    Formats an enrollment statistic for printing.
+
+    Args:
+        value (float): Statistic, NaN if the school has no data for it
+
+    Returns:
+        str: The value as a whole number, or "n/a" for NaN
+    """
+    import numpy as np
+    return "n/a" if np.isnan(value) else str(int(value))
+
+
+def enrollment_totals(data):
+    """
+    Sums enrollment over the grade (last) axis. Cells where every grade is missing (the school has
+    no row for that year) stay NaN rather than counting as zero enrollment.
+
+    Args:
+        data (npArray): Enrollment data with grades along the last axis, NaN for missing
+
+    Returns:
+        npArray: Totals with the grade axis removed
+    """
+    import numpy as np
+    return np.where(np.isnan(data).all(axis=-1), np.nan, np.nansum(data, axis=-1))
+
+
 class HighSchoolData():
     """
     One class to print and calculate any school statistics needed for this assignment.
+    Uses the given data by default, any enrollment csv file laid out like Assignment3Data.csv, or a
+    compact .npy cube written by save(), which is memory-mapped instead of read into memory. A csv file
+    can be given a cache_path: the cube is then saved there once and memory-mapped on later runs.
 
     Variables:
         school_names (npArray): Array containing all school names in order of lowest to highest code
         school_codes (npArray): Array containing all school codes in order of lowest to highest code
-        data_list (dict): Dictionary containing year as key and the data for that year as the value
+        data_list (dict): Dictionary containing year as key and the data for that year as the value (given data only)
+        file_path (str): Enrollment csv or .npy file the data was loaded from, None for the given data
+        cache_path (str): .npy cache of a csv file_path, None to always parse the csv
+        years (npArray): Year of each entry along the first axis of data
+        data (npArray): Enrollment data with shape (year, school, grade), decoded from the memory map on first use
+        school_index (dict): School code or exact school name -> position along the school axis of data
+        stats (npArray): Structured array of precomputed statistics, one entry per school (see stats_fields,
+            plus a yearly_totals field with one total per year)
+        yearly_totals (npArray): Total enrollment of every school in every year with shape (year, school),
+            NaN for years a school has no data
     """
 
     # Array of school names - arranged in same order as schoolCodes (lowest to highest numerical value)
-    school_names = np.array(["Centennial High School",
+    school_names = ["Centennial High School",
                             "Robert Thirsk School",
                             "Louise Dean School",
                             "Queen Elizabeth High School",
@@ -42,29 +90,199 @@ class HighSchoolData():
                             "Sir Winston Churchill High School",
                             "Dr. E. P. Scarlett High School",
                             "John G Diefenbaker High School",
-                            "Lester B. Pearson High School"])
+                            "Lester B. Pearson High School"]
     
     # School codes in ascending numerical order
-    school_codes = np.array(["1224", "1679", "9626", "9806", "9813", "9815", 
-                            "9816", "9823", "9825", "9826", "9829", "9830", 
-                            "9836", "9847", "9850", "9856", "9857", "9858", "9860", "9865"])
-    
-    # List of data for each year
-    data_list = {2013:year_2013, 2014:year_2014, 2015:year_2015, 2016:year_2016, 2017:year_2017, 2018:year_2018, 2019:year_2019, 2020:year_2020, 
-                2021:year_2021, 2022:year_2022}
+    school_codes = ["1224", "1679", "9626", "9806", "9813", "9815", 
+                    "9816", "9823", "9825", "9826", "9829", "9830", 
+                    "9836", "9847", "9850", "9856", "9857", "9858", "9860", "9865"]
+
+    # Fields of the precomputed per-school statistics
+    stats_fields = [("mean_grade_10", float), ("mean_grade_11", float), ("mean_grade_12", float),
+                    ("highest", float), ("lowest", float), ("total", float), ("mean_yearly_total", float),
+                    ("high_enrollment_median", float)]
+
+    # Enrollments above this count towards the high enrollment median
+    high_enrollment = 500
 
-    def __init__(self):
+    def __init__(self, file_path=None, cache_path=None):
+        self.file_path = file_path
+        self.cache_path = cache_path
+        self.stats = None
+        self.yearly_totals = None
+        # Memory-mapped raw cube and its missing value sentinel when loaded from a .npy file
+        self._raw = None
+        self._sentinel = None
+        self._data = None
+        # source_key() of the csv the data was loaded from, None for other sources
+        self._source = None
         self.load_data()
 
 
+    @property
+    def data(self):
+        """
+        Enrollment data with shape (year, school, grade). A memory-mapped cube is only decoded in full
+        the first time a whole-cube computation needs it.
+
+        Returns:
+            npArray: Enrollment data, NaN for missing
+        """
+        if self._data is None and self._raw is not None:
+            self._data = decode(self._raw, self._sentinel)
+        return self._data
+
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+
     def load_data(self):
         """
         Loads highschool enrollment data into a 3D array with shape: (year, school, grade)
         """
-        reshaped_data = []
-        for year, data in self.data_list.items():
-            reshaped_data.append(data.reshape(20,3))
-        self.data = np.stack(reshaped_data, axis=0)
+        import numpy as np
+        if self.file_path is not None and self.file_path.endswith(".npy"):
+            # Opening the memory map reads only the file header, the data is paged in as it is used
+            self.years, self.school_codes, self.school_names, self._raw, self._sentinel = open_cube(self.file_path)
+        elif self.file_path is not None:
+            # A cache built from this very file (same path, size and modification time) is served instead
+            if self.cache_path is None or not self.open_cache():
+                # Schools and years come from the file, replacing the hard-coded ones. The key is taken
+                # first, so a file changed while it is read never matches the cache
+                self._source = source_key(self.file_path)
+                self.years, self.school_codes, self.school_names, self.data = load_enrollment_csv(self.file_path)
+                if self.cache_path is not None:
+                    self.save(self.cache_path)
+        else:
+            import given_data
+            # List of data for each year
+            self.data_list = {2013:given_data.year_2013, 2014:given_data.year_2014, 2015:given_data.year_2015,
+                              2016:given_data.year_2016, 2017:given_data.year_2017, 2018:given_data.year_2018,
+                              2019:given_data.year_2019, 2020:given_data.year_2020, 2021:given_data.year_2021,
+                              2022:given_data.year_2022}
+            self.school_names = np.array(self.school_names)
+            self.school_codes = np.array(self.school_codes)
+            reshaped_data = []
+            for year, data in self.data_list.items():
+                reshaped_data.append(data.reshape(len(self.school_codes), 3))
+            self.data = np.stack(reshaped_data, axis=0)
+            self.years = np.array(list(self.data_list.keys()))
+        self.build_school_index()
+
+
+    def open_cache(self):
+        """
+        Opens the memory-mapped cache if it was built from the current version of the csv file.
+        A missing, damaged or mismatched cache (or sidecar) is a cache miss.
+
+        Returns:
+            bool: True if the cache was opened
+        """
+        try:
+            source = source_key(self.file_path)
+            if cube_source(self.cache_path) != source:
+                return False
+            self.years, self.school_codes, self.school_names, self._raw, self._sentinel = open_cube(self.cache_path)
+        except (OSError, ValueError, KeyError):
+            return False
+        self._source = source
+        return True
+
+
+    def build_school_index(self):
+        """
+        Builds the hashed lookups from school code and name to the school's position, so identifiers
+        resolve in constant time instead of scanning the code and name arrays.
+        """
+        self.school_index = {}
+        # Names first so a code always wins if a name ever looks like a code
+        for idx, name in enumerate(self.school_names):
+            self.school_index[str(name)] = idx
+        for idx, code in enumerate(self.school_codes):
+            self.school_index[str(code)] = idx
+        # Case-insensitive names, plus the same names sorted for prefix searches
+        self._folded_names = {str(name).casefold(): idx for idx, name in enumerate(self.school_names)}
+        self._sorted_names = sorted(self._folded_names)
+
+
+    def resolve_school(self, school_identifier):
+        """
+        Finds the position of a school from its code or name. Tries, in order: exact code or name,
+        case-insensitive name, a name prefix that only one school starts with, and a close spelling.
+
+        Args:
+            school_identifier (int or string): Either a 4 digit school code or (part of a) school name
+
+        Raises:
+            ValueError: School code or name was not found, or the prefix matches several schools
+
+        Returns:
+            int: Position of the school along the school axis of data
+        """
+        key = str(school_identifier).strip()
+        # Exact code or name
+        if key in self.school_index:
+            return self.school_index[key]
+        folded = key.casefold()
+        if not folded:
+            raise ValueError("You must enter a valid school name or code.")
+        # Case-insensitive name
+        if folded in self._folded_names:
+            return self._folded_names[folded]
+        # Prefix: binary search the sorted names for the first one starting with the prefix
+        start = bisect.bisect_left(self._sorted_names, folded)
+        matches = []
+        for name in self._sorted_names[start:start + 2]:
+            if name.startswith(folded):
+                matches.append(name)
+        if len(matches) == 1:
+            return self._folded_names[matches[0]]
+        if len(matches) > 1:
+            raise ValueError(f"'{key}' matches more than one school, please enter more of the name.")
+        # Close spelling (only reached on a miss)
+        close = difflib.get_close_matches(folded, self._sorted_names, n=1, cutoff=0.85)
+        if close:
+            return self._folded_names[close[0]]
+        raise ValueError("You must enter a valid school name or code.")
+
+
+    def resolve_schools(self, school_identifiers):
+        """
+        Resolves many school codes or names in one call.
+
+        Args:
+            school_identifiers (list): School codes and/or names
+
+        Raises:
+            ValueError: One or more identifiers were not found (all of them are listed)
+
+        Returns:
+            npArray[int]: Position of each school along the school axis of data
+        """
+        import numpy as np
+        positions = []
+        missing = []
+        for identifier in school_identifiers:
+            try:
+                positions.append(self.resolve_school(identifier))
+            except ValueError:
+                missing.append(str(identifier))
+        if missing:
+            raise ValueError(f"Schools not found: {', '.join(missing)}")
+        return np.array(positions, dtype=np.intp)
+
+
+    def save(self, file_path):
+        """
+        Saves the enrollment data as a compact memory-mappable .npy cube (smallest integer dtype that fits,
+        with a sentinel for missing values) so later runs can open it with HighSchoolData(file_path).
+
+        Args:
+            file_path (str): Path of the .npy file, a .json sidecar is written next to it
+        """
+        save_cube(file_path, self.years, self.school_codes, self.school_names, self.data, self._source)
 
 
     def print_shape(self):
@@ -74,7 +292,8 @@ class HighSchoolData():
         Returns:
             npArray: shape of array.
         """
-        return self.data.shape
+        # The memory map knows its shape without decoding anything
+        return (self._raw if self._data is None else self._data).shape
 
 
     def get_dimensions(self):
@@ -84,7 +303,7 @@ class HighSchoolData():
         Returns:
             int: Number of dimensions. 
         """
-        return self.data.ndim
+        return (self._raw if self._data is None else self._data).ndim
     
 
     def get_school_data(self, school_identifier):
@@ -100,19 +319,13 @@ class HighSchoolData():
         Returns:
             npArray[int, int]: 2D array where the rows are the year and collumns are grade
         """
-        # Make sure school code exists
-        if school_identifier in self.school_codes:
-            # get index of data array corresponding to the school code
-            idx = np.where(self.school_codes == school_identifier)[0][0]
-            # return all years and grades for given school index
-            return self.data[:,idx,:]
-        # Make sure school name exists if code not found
-        elif school_identifier in self.school_names:
-            # get index of array corresponding to school name
-            idx = np.where(self.school_names == school_identifier)[0][0]
-            return self.data[:,idx,:]
-        else:
-            raise ValueError("You must enter a valid school name or code.")
+        # Look up the school's position (raises ValueError if the school does not exist)
+        idx = self.resolve_school(school_identifier)
+        # Memory-mapped cube: only decode this school's block, which is contiguous on disk
+        if self._data is None and self._raw is not None:
+            return decode(self._raw[:,idx,:], self._sentinel)
+        # return all years and grades for given school index
+        return self.data[:,idx,:]
     
     def print_school_stats(self, school_identifier):
         """
@@ -131,46 +344,41 @@ class HighSchoolData():
         Args:
             school_identifier (int or string) Either a 4 digit school code or school name as a string
         """
-        # Get given school data
-        data = self.get_school_data(school_identifier)
+        import numpy as np
+        # Get the school's position (resolved once, used for both the statistics and the name/code)
+        idx = self.resolve_school(school_identifier)
+        # All statistics come from the precomputed table, nothing is recalculated here
+        stats = self.get_school_stats(positions=[idx])[0]
         # 1. Print school info (if given code get name and vice versa)
-        if school_identifier in self.school_codes:
-            name = self.school_names[np.where(self.school_codes == school_identifier)[0][0]]
-            code = school_identifier
-        elif school_identifier in self.school_names:
-            code = self.school_codes[np.where(self.school_names == school_identifier)[0][0]]
-            name = school_identifier
-        # Should never get here but safe coding regardless :)
-        else:
-            raise ValueError("Invalid school identifier")
+        name = self.school_names[idx]
+        code = self.school_codes[idx]
 
         print(f"School Name: {name}, School Code: {code}")
         # 2. Print mean enrollment for grade 10
-        print(f"Total enrollment for Grade 10: {int(np.nanmean(data[:,0]))}")
+        print(f"Total enrollment for Grade 10: {count_text(stats['mean_grade_10'])}")
         # 3. Print mean enrollment for grade 11
-        print(f"Total enrollment for Grade 11: {int(np.nanmean(data[:,1]))}")
+        print(f"Total enrollment for Grade 11: {count_text(stats['mean_grade_11'])}")
         # 4. Print mean enrollment for grade 12
-        print(f"Total enrollment for Grade 12: {int(np.nanmean(data[:,2]))}")
+        print(f"Total enrollment for Grade 12: {count_text(stats['mean_grade_12'])}")
         # 5. Print highest enrollment 
-        print(f"Highest enrollment for a single grade: {int(np.nanmax(data))}")
+        print(f"Highest enrollment for a single grade: {count_text(stats['highest'])}")
         # 6. Print lowest enrollment
-        print(f"Lowest enrollment for a single grade: {int(np.nanmin(data))}")
+        print(f"Lowest enrollment for a single grade: {count_text(stats['lowest'])}")
         # 7. Print total enrollment data
-        idx = 0
-        # Loop indexed weird so that it is easier to print
-        for i in range(2013, 2023):
-            print(f"Total enrollment for {i}: {int(np.nansum(data[idx, :]))}")
-            idx += 1
+        for year_idx, year in enumerate(self.years):
+            print(f"Total enrollment for {year}: {count_text(stats['yearly_totals'][year_idx])}")
+        # Files with other year spans are supported, the given data has ten years
+        year_count = len(self.years)
+        span = "ten" if year_count == 10 else str(year_count)
         # 8. Print total ten year enrollment
-        print(f"Total ten year enrollment: {int(np.nansum(data))}")
+        print(f"Total {span} year enrollment: {count_text(stats['total'])}")
         # 9. Mean Total yearly enrollment over 10 years (sum all grades for each year than take mean over entire time period)
-        sum = np.nansum(data, axis=1)
-        print(f"Mean total enrollment over 10 years: {int(np.nanmean(sum))}")
+        print(f"Mean total enrollment over {year_count} years: {count_text(stats['mean_yearly_total'])}")
         # 10. Median value of years where enrollment is over 500
-        median = self.find_high_enrollment(data)
-        # If not None       
-        if median:
-            print(f"For all enrollments over 500, the median value was: {int(self.find_high_enrollment(data))}")
+        median = stats['high_enrollment_median']
+        # NaN when there were none
+        if not np.isnan(median):
+            print(f"For all enrollments over 500, the median value was: {int(median)}")
         else:
             print(f"No enrollments over 500.")
     
@@ -185,6 +393,7 @@ class HighSchoolData():
         Returns:
             double: Median value. None if there are no values greater than 500
         """
+        import numpy as np
         # use a mask to find values greater than 500
         mask = data > 500
         # return None if there is no enrollment above 500
@@ -194,6 +403,144 @@ class HighSchoolData():
             return np.nanmedian(data[mask])
     
 
+    def compute_school_stats(self):
+        """
+        Computes every per-school statistic for all schools at once with vectorized reductions over
+        the (year, school, grade) array, and caches them in stats and yearly_totals. The running sums
+        and counts are kept so append_year() can update the statistics without rescanning old years.
+
+        Returns:
+            npArray: Structured array of statistics, one entry per school
+        """
+        self._grade_sums, self._grade_counts, self._highest, self._lowest, self.yearly_totals = self._reduce(self.data)
+        self._refresh_stats()
+        return self.stats
+
+
+    def append_year(self, year, year_data):
+        """
+        Adds a new year of enrollment data and updates the cached statistics incrementally.
+        Only the high enrollment median needs another pass over the data, as medians cannot be combined.
+
+        Args:
+            year (int): The new year, must be later than the last loaded year
+            year_data (npArray): Enrollment with shape (school, grade) in the same school order as data
+
+        Raises:
+            ValueError: The year is not after the last year, or the data has the wrong shape
+        """
+        import numpy as np
+        year_data = np.asarray(year_data, dtype=float)
+        if year <= self.years[-1]:
+            raise ValueError(f"{year} must be after {self.years[-1]}.")
+        if year_data.shape != self.data.shape[1:]:
+            raise ValueError(f"Year data must have shape {self.data.shape[1:]}.")
+
+        self.data = np.concatenate([self.data, year_data[np.newaxis]], axis=0)
+        self.years = np.append(self.years, year)
+        if self.stats is None:
+            return
+        self._grade_sums += np.nan_to_num(year_data)
+        self._grade_counts += ~np.isnan(year_data)
+        self._highest = np.fmax(self._highest, np.fmax.reduce(year_data, axis=1))
+        self._lowest = np.fmin(self._lowest, np.fmin.reduce(year_data, axis=1))
+        self.yearly_totals = np.vstack([self.yearly_totals, enrollment_totals(year_data)])
+        self._refresh_stats()
+
+
+    def get_school_stats(self, school_identifiers=None, positions=None):
+        """
+        Gets the precomputed statistics of some or all schools, computing them on first use.
+
+        Args:
+            school_identifiers (list): School codes and/or names (a code may be given as an int)
+            positions (list): Positions along the school axis of data, for schools already resolved
+                (only used when school_identifiers is None, both None for every school)
+
+        Raises:
+            ValueError: One or more identifiers were not found
+
+        Returns:
+            npArray: Structured array of statistics (see stats_fields), one entry per requested school
+        """
+        import numpy as np
+        if school_identifiers is not None:
+            positions = self.resolve_schools(school_identifiers)
+        elif positions is not None:
+            positions = np.asarray(positions, dtype=np.intp)
+        # Memory-mapped cube without cached stats: only read and reduce the requested schools' pages
+        if self.stats is None and self._data is None and self._raw is not None and positions is not None:
+            block = decode(self._raw[:,positions,:], self._sentinel)
+            return self._build_stats(*self._reduce(block), block)
+        if self.stats is None:
+            self.compute_school_stats()
+        if positions is None:
+            return self.stats
+        return self.stats[positions]
+
+
+    @staticmethod
+    def _reduce(data):
+        """
+        Reduces enrollment data over the year (and grade) axes into the accumulators the stats are built from.
+
+        Args:
+            data (npArray): Enrollment data with shape (year, school, grade)
+
+        Returns:
+            tuple(npArray, ...): Per school grade sums and counts, highest and lowest enrollment, and the
+                (year, school) yearly totals
+        """
+        import numpy as np
+        grade_sums = np.nansum(data, axis=0)
+        grade_counts = np.count_nonzero(~np.isnan(data), axis=0)
+        # fmax/fmin skip NaN without warning about schools that have no data
+        highest = np.fmax.reduce(data, axis=(0, 2))
+        lowest = np.fmin.reduce(data, axis=(0, 2))
+        yearly_totals = enrollment_totals(data)
+        return grade_sums, grade_counts, highest, lowest, yearly_totals
+
+
+    def _build_stats(self, grade_sums, grade_counts, highest, lowest, yearly_totals, data):
+        """
+        Builds the stats table from the accumulators.
+
+        Args:
+            grade_sums, grade_counts, highest, lowest, yearly_totals (npArray): Accumulators from _reduce()
+            data (npArray): Enrollment data the accumulators came from, used for the median
+
+        Returns:
+            npArray: Structured array of statistics, one entry per school
+        """
+        import numpy as np
+        dtype = np.dtype(self.stats_fields + [("yearly_totals", float, (len(yearly_totals),))])
+        stats = np.empty(data.shape[1], dtype=dtype)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = grade_sums / grade_counts
+        stats["mean_grade_10"], stats["mean_grade_11"], stats["mean_grade_12"] = means.T
+        stats["highest"] = highest
+        stats["lowest"] = lowest
+        stats["yearly_totals"] = yearly_totals.T
+        # Totals and means only count the years a school has data for, NaN if it has none
+        stats["total"] = enrollment_totals(yearly_totals.T)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats["mean_yearly_total"] = stats["total"] / np.count_nonzero(~np.isnan(yearly_totals), axis=0)
+        # Median of the enrollments over 500 per school, NaN if there were none
+        high = np.where(data > self.high_enrollment, data, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            stats["high_enrollment_median"] = np.nanmedian(high.transpose(1, 0, 2).reshape(len(stats), -1), axis=1)
+        return stats
+
+
+    def _refresh_stats(self):
+        """
+        Rebuilds the cached stats table from the running accumulators.
+        """
+        self.stats = self._build_stats(self._grade_sums, self._grade_counts, self._highest, self._lowest,
+                                       self.yearly_totals, self.data)
+
+
     def print_general_stats(self):
         """
         Prints overall statistics for the entire dataset.
@@ -203,24 +550,161 @@ class HighSchoolData():
         4. Highest enrollment for a single grade (all schools entire time period)
         5. Lowest enrollment for a single grade (all schools entire time period)
         """
-        # 1. mean enrollment in 2013
-        print(f"Mean enrollment in 2013: {int(np.nanmean(self.data_list[2013]))}")
-        # 2. mean enrollment in 2022
-        print(f"Mean enrollment in 2022: {int(np.nanmean(self.data_list[2022]))}")
-        # 3. total graduating class of 2022 across all schools
-        year = self.data_list[2022].reshape(20,3)
-        print(f"Total graduating class of 2022: {int(np.nansum(year[:, 2]))}")
+        import numpy as np
+        first_year, last_year = self.years[0], self.years[-1]
+        # 1. mean enrollment in the first year (2013)
+        print(f"Mean enrollment in {first_year}: {int(np.nanmean(self.data[0]))}")
+        # 2. mean enrollment in the last year (2022)
+        print(f"Mean enrollment in {last_year}: {int(np.nanmean(self.data[-1]))}")
+        # 3. total graduating class of the last year across all schools
+        print(f"Total graduating class of {last_year}: {int(np.nansum(self.data[-1, :, 2]))}")
         # 4. Highest enrollment for a single grade (all schools entire time period)
-        # loop through dict of year statistics and find max
-        print(f"Highest enrollment for a single grade: {int(np.nanmax([np.nanmax(data) for data in self.data_list.values()]))}")
+        print(f"Highest enrollment for a single grade: {int(np.nanmax(self.data))}")
         # 5. Lowest enrollment for a single grade (all schools entire time period)
-        print(f"Highest enrollment for a single grade: {int(np.nanmin([np.nanmin(data) for data in self.data_list.values()]))}")
+        print(f"Highest enrollment for a single grade: {int(np.nanmin(self.data))}")
+
 
+def school_records(hsd, school_identifiers):
+    """
+    Generates the statistics of many schools as plain dictionaries, one per identifier, in order.
+    Identifiers that cannot be resolved produce a record with an "error" instead.
+
+    Args:
+        hsd (HighSchoolData): Loaded enrollment data
+        school_identifiers (iterable): School codes and/or names
+
+    Yields:
+        dict: query, code, name, each statistic and a total per year (or query and error)
+    """
+    import numpy as np
+    for identifier in school_identifiers:
+        try:
+            idx = hsd.resolve_school(identifier)
+        except ValueError as e:
+            yield {"query": identifier, "error": str(e)}
+            continue
+        stats = hsd.get_school_stats(positions=[idx])[0]
+        record = {"query": identifier, "code": str(hsd.school_codes[idx]), "name": str(hsd.school_names[idx])}
+        for field, _ in hsd.stats_fields:
+            value = float(stats[field])
+            # NaN is not valid JSON, missing values are written as null
+            record[field] = None if np.isnan(value) else value
+        for year, total in zip(hsd.years, stats["yearly_totals"]):
+            record[f"total_{year}"] = None if np.isnan(total) else float(total)
+        yield record
+
+
+def read_queries(queries, file_path):
+    """
+    Collects the queries given on the command line and/or in a file (one per line, "-" for stdin).
+    The file is opened straight away, so a file that cannot be read is reported before any output.
+    Mirrors read_queries() in a4/calgary_dogs.py, keep the two the same.
+
+    Args:
+        queries (list[str]): Queries given on the command line
+        file_path (str): File of queries, "-" for stdin, None for none
+
+    Raises:
+        OSError: The file cannot be opened
+
+    Returns:
+        iterator[str]: Each non-empty query
+    """
+    f = None
+    if file_path:
+        f = sys.stdin if file_path == "-" else open(file_path)
+
+    def lines():
+        yield from queries
+        if f is not None:
+            with f:
+                for line in f:
+                    if line.strip():
+                        yield line.strip()
+
+    return lines()
+
+
+def record_fields(hsd):
+    """
+    Gets the column names of the records made by school_records(), for CSV output.
+
+    Args:
+        hsd (HighSchoolData): Loaded enrollment data
+
+    Returns:
+        list[str]: Column names
+    """
+    return (["query", "code", "name"] + [field for field, _ in hsd.stats_fields] +
+            [f"total_{year}" for year in hsd.years] + ["error"])
+
+
+def write_records(records, output_format, fields, out=sys.stdout):
+    """
+    Streams records to out as JSON lines or CSV (list values joined with spaces), flushing after
+    each one so results appear as they are made.
+    Mirrors write_records() in a4/calgary_dogs.py, keep the two the same.
+
+    Args:
+        records (iterable[dict]): Records to write
+        output_format (str): "jsonl" or "csv"
+        fields (list[str]): CSV columns
+        out (file): Where to write
+
+    Returns:
+        int: Number of records that had an error
+    """
+    errors = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+    for record in records:
+        errors += "error" in record
+        if output_format == "jsonl":
+            out.write(json.dumps(record) + "\n")
+        else:
+            writer.writerow({key: " ".join(map(str, value)) if isinstance(value, list) else value
+                             for key, value in record.items()})
+        out.flush()
+    return errors
+
+
+def parse_args(argv):
+    """
+    Parses the command line.
+
+    Args:
+        argv (list[str]): Arguments after the program name
+
+    Returns:
+        Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="ENSF 692 School Enrollment Statistics. Without queries the "
+                                                 "interactive program runs; with queries every school is answered "
+                                                 "in one batch.")
+    parser.add_argument("queries", nargs="*", help="School codes or names")
+    parser.add_argument("-f", "--file", help="File with one school code or name per line, - for stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="Batch output format")
+    parser.add_argument("--data", help="Enrollment csv or .npy cube to use instead of the given data")
+    parser.add_argument("--cache", help="Memory-mapped .npy cache for a csv --data file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.queries or args.file:
+        # Batch mode: load once, answer every query, stream the results
+        try:
+            queries = read_queries(args.queries, args.file)
+        except OSError as e:
+            sys.exit(f"school_data.py: {e}")
+        hsd = HighSchoolData(args.data, args.cache)
+        errors = write_records(school_records(hsd, queries), args.format, record_fields(hsd))
+        sys.exit(1 if errors else 0)
 
-def main():
     print("ENSF 692 School Enrollment Statistics")
     # Print Stage 1 requirements here
-    hsd = HighSchoolData()
+    hsd = HighSchoolData(args.data, args.cache)
     print(f"Shape of full data array: {hsd.print_shape()}")
     print(f"Dimensions of full data array: {hsd.get_dimensions()}")
 
@@ -0,0 +1,73 @@
+# bench_cache.py
+# Aidan MacNichol
+#
+# Compares loading the dog breed data by parsing CalgaryDogBreeds.xlsx (cold) with loading the
+# Feather cache written by calgary_dogs.py (warm), and the memory taken by the loaded DataFrame.
+# pandas, openpyxl and pyarrow are imported before timing, so only the loads themselves are measured.
+#
+# Usage: python bench_cache.py [--runs 10] [--file CalgaryDogBreeds.xlsx]
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from calgary_dogs import DogBreedAnalyzer
+
+
+def best_time(load, runs):
+    """
+    Times a load function.
+
+    Args:
+        load (function): Function that loads the data and returns the DataFrame
+        runs (int): Number of runs
+
+    Returns:
+        tuple(float, DataFrame): Best time in seconds and the loaded data
+    """
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        df = load()
+        best = min(best, time.perf_counter() - start)
+    return best, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold workbook parsing vs warm Feather cache loads.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--file", default="CalgaryDogBreeds.xlsx")
+    args = parser.parse_args()
+
+    analyzer = DogBreedAnalyzer(args.file)
+    # Import the readers up front and make sure the cache exists
+    pd.read_excel(args.file)
+    analyzer.load_data()
+
+    def cold():
+        return DogBreedAnalyzer(args.file, use_cache=False).df
+
+    def warm():
+        return DogBreedAnalyzer(args.file).df
+
+    def touched():
+        # Modification time changed but not the contents, the hash has to be checked
+        os.utime(args.file)
+        return DogBreedAnalyzer(args.file).df
+
+    results = {"cold (parse workbook)": best_time(cold, args.runs),
+               "warm (feather cache)": best_time(warm, args.runs),
+               "warm after touch (hash check)": best_time(touched, args.runs)}
+    cold_time = results["cold (parse workbook)"][0]
+    for name, (seconds, df) in results.items():
+        print(f"{name:>30}: {seconds * 1000:8.2f} ms  ({cold_time / seconds:6.1f}x)")
+
+    plain = pd.read_excel(args.file)
+    for name, df in (("plain strings", plain), ("categoricals", analyzer.df)):
+        print(f"{name:>30}: {df.memory_usage(deep=True).sum() / 1024:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
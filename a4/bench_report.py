@@ -0,0 +1,69 @@
+# bench_report.py
+# Aidan MacNichol
+#
+# Compares getting every breed's statistics one breed at a time (breed_summary) with the single
+# pass breed_report(). The workbook's three years are copied back in time, with the counts
+# scaled randomly, to build a Top-100 history over many years.
+#
+# Usage: python bench_report.py [--years 3 10 30 100] [--file CalgaryDogBreeds.xlsx]
+
+import argparse
+import time
+
+import numpy as np
+
+from calgary_dogs import DogBreedAnalyzer
+
+
+def make_analyzer(file_path, years, seed=0):
+    """
+    Builds an analyzer whose data covers the given number of years.
+
+    Args:
+        file_path (str): Registration workbook
+        years (int): Number of years of history (at least the workbook's own)
+        seed (int): Random seed
+
+    Returns:
+        DogBreedAnalyzer: Analyzer with the extended data
+    """
+    analyzer = DogBreedAnalyzer(file_path)
+    base = analyzer.df.copy()
+    base["Breed"] = base["Breed"].astype(str)
+    base["Month"] = base["Month"].astype(str)
+    real_years = base["Year"].unique()
+    rng = np.random.default_rng(seed)
+    for i in range(years - len(real_years)):
+        # Each earlier year reuses one of the real years' rows
+        rows = base[base["Year"] == real_years[i % len(real_years)]].copy()
+        rows["Year"] = int(real_years.min()) - 1 - i
+        rows["Total"] = np.maximum(1, (rows["Total"] * rng.uniform(0.5, 1.5, len(rows))).astype(int))
+        analyzer.append_rows(rows)
+    return analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-breed summaries vs the one pass breed report.")
+    parser.add_argument("--years", type=int, nargs="+", default=[3, 10, 30, 100])
+    parser.add_argument("--file", default="CalgaryDogBreeds.xlsx")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for years in args.years:
+        analyzer = make_analyzer(args.file, years)
+        breeds = list(analyzer.breed_rows)
+        timings = {}
+        for name, run in (("per breed", lambda: [analyzer.breed_summary(breed) for breed in breeds]),
+                          ("one pass", analyzer.breed_report)):
+            best = float("inf")
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        print(f"{years:>4} years, {len(analyzer.df):>7} rows: per breed {timings['per breed'] * 1000:9.1f} ms   "
+              f"one pass {timings['one pass'] * 1000:7.1f} ms   ({timings['per breed'] / timings['one pass']:5.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,25 +7,364 @@
 # You may import any modules from the standard Python library.
 # Remember to include docstrings and comments.
 
-import pandas as pd 
-import numpy as np 
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+
+# pandas is imported the first time the data is loaded (see load_data), not when the tool starts
+
+# Calendar order of the Month column's values, used for month windows
+month_names = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+               "October", "November", "December"]
 
 class DogBreedAnalyzer:
+    """
+    Loads the Calgary dog breed registrations and prints statistics for a breed.
+    The workbook is not read until the data is first needed (or preload() is called), so the
+    prompt can appear straight away.
+
+    Parsing the workbook is slow, so the parsed data is also kept in a Feather file next to it
+    and later runs load that instead. The cache records the workbook's modification time, size
+    and SHA-256 hash and is rebuilt when the workbook changes.
+
+    When the data is loaded the row positions of every breed and the registration totals are
+    worked out once, so a query only looks at its breed's rows instead of scanning the whole table.
+
+    Statistics can be limited to a window of years and/or months (set_window). The years reported
+    are whichever the data has within the window.
+
+    Variables:
+        file_path (str): Path of the Excel workbook
+        cache_path (str): Path of the Feather cache, None to always parse the workbook
+        df (DataFrame): Registration data, loaded on first access
+        breed_rows (dict): Breed name -> positions of its rows in df
+        year_totals (dict): Year -> registrations of all breeds that year
+        period_totals (dict): (Year, Month) -> registrations of all breeds that month
+        total (int): Registrations of all breeds over all years
+        window_years (tuple(int, int)): First and last year included (None for no limit), None for every year
+        window_months (list[str]): Months included, None for every month
+    """
     
-    def __init__(self, file_path = "CalgaryDogBreeds.xlsx"):
-        self.df = pd.read_excel(file_path)
+    def __init__(self, file_path = "CalgaryDogBreeds.xlsx", use_cache = True):
+        self.file_path = file_path
+        self.cache_path = os.path.splitext(file_path)[0] + ".feather" if use_cache else None
+        self._df = None
+        self._lock = threading.Lock()
+        self.breed_rows = {}
+        self.year_totals = {}
+        self.period_totals = {}
+        self.total = 0
+        self.window_years = None
+        self.window_months = None
+
+
+    @property
+    def df(self):
+        """
+        Registration data, loading it first if needed.
+
+        Returns:
+            DataFrame: Registration data with Year, Month, Breed and Total columns
+        """
+        if self._df is None:
+            self.load_data()
+        return self._df
+
+
+    def load_data(self):
+        """
+        Imports pandas and loads the data from the cache, or from the workbook if the cache is
+        missing or out of date. Safe to call from several threads, it only loads once.
+        """
+        with self._lock:
+            if self._df is not None:
+                return
+            df = self.read_cache()
+            if df is None:
+                df = self.read_workbook()
+                self.write_cache(df)
+            self.build_index(df)
+            self._df = df
+
+
+    def build_index(self, df):
+        """
+        Works out the row positions of every breed and the monthly, yearly and overall totals.
+
+        Args:
+            df (DataFrame): Registration data
+        """
+        # Positions keep the rows in their original order, like a boolean mask would
+        self.breed_rows = df.groupby("Breed", observed=True, sort=False).indices
+        self.year_totals = {int(year): int(total) for year, total in df.groupby("Year")["Total"].sum().items()}
+        self.period_totals = {(int(year), str(month)): int(total) for (year, month), total
+                              in df.groupby(["Year", "Month"], observed=True)["Total"].sum().items()}
+        self.total = int(df["Total"].sum())
+
+
+    def append_rows(self, rows):
+        """
+        Adds registrations to the data, updating the breed index and totals with just the new rows.
+
+        Args:
+            rows (DataFrame): New rows with Year, Month, Breed and Total columns
+        """
+        import numpy as np
+        import pandas as pd
+        df = self.df
+        rows = rows[["Year", "Month", "Breed", "Total"]].copy()
+        rows["Breed"] = rows["Breed"].str.upper()
+        with self._lock:
+            start = len(df)
+            df = df.copy()
+            # Extend the categories with any new breeds or months so both sides can be concatenated
+            for column in ["Breed", "Month"]:
+                categories = df[column].cat.categories
+                new = pd.Index(pd.unique(rows[column])).difference(categories, sort=False)
+                df[column] = df[column].cat.add_categories(new)
+                rows[column] = pd.Categorical(rows[column], categories=df[column].cat.categories)
+            df = pd.concat([df, rows], ignore_index=True)
+
+            breed_rows = dict(self.breed_rows)
+            for breed, positions in rows.groupby("Breed", observed=True, sort=False).indices.items():
+                breed_rows[breed] = np.concatenate([breed_rows.get(breed, positions[:0]), positions + start])
+            year_totals = dict(self.year_totals)
+            for year, total in rows.groupby("Year")["Total"].sum().items():
+                year_totals[int(year)] = year_totals.get(int(year), 0) + int(total)
+            period_totals = dict(self.period_totals)
+            for (year, month), total in rows.groupby(["Year", "Month"], observed=True)["Total"].sum().items():
+                period_totals[int(year), str(month)] = period_totals.get((int(year), str(month)), 0) + int(total)
+            # Swap everything in at the end, so readers never see new data with old totals for long
+            self.breed_rows, self.year_totals, self.period_totals = breed_rows, year_totals, period_totals
+            self.total += int(rows["Total"].sum())
+            self._df = df
+
+
+    def read_workbook(self):
+        """
+        Parses the workbook. Breed and Month are stored as categoricals, which takes far less
+        memory than repeating the same few strings on every row.
+
+        Returns:
+            DataFrame: Registration data
+        """
+        import pandas as pd
+        df = pd.read_excel(self.file_path)
         # It looks like they are already uppercase but this is good practice regardless
-        self.df['Breed'] = self.df['Breed'].str.upper()
-        
+        df['Breed'] = df['Breed'].str.upper()
+        for column in ['Breed', 'Month']:
+            df[column] = pd.Categorical(df[column], categories=df[column].unique())
+        return df
+
+
+    def source_key(self, sha256=None):
+        """
+        Identifies the current version of the workbook.
+
+        Args:
+            sha256 (str): Hash of the workbook if already known, otherwise it is calculated
+
+        Returns:
+            dict: Modification time (ns), size and SHA-256 hash of the workbook
+        """
+        stat = os.stat(self.file_path)
+        if sha256 is None:
+            # Hashed in 1 MiB chunks so the whole workbook is never read into memory at once
+            digest = hashlib.sha256()
+            with open(self.file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+
+
+    def read_cache(self):
+        """
+        Loads the cache if it matches the workbook. When only the modification time differs, the
+        hash decides: if the contents are unchanged the cache is kept and its key updated.
+
+        Returns:
+            DataFrame: Registration data, None if there is no usable cache
+        """
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.cache_path + ".json") as f:
+                key = json.load(f)
+            stat = os.stat(self.file_path)
+            if (key["mtime_ns"], key["size"]) != (stat.st_mtime_ns, stat.st_size):
+                if key["size"] != stat.st_size or key["sha256"] != self.source_key()["sha256"]:
+                    return None
+                self.write_key(self.source_key(key["sha256"]))
+            import pandas as pd
+            return pd.read_feather(self.cache_path)
+        # No cache yet, a damaged cache or no pyarrow: parse the workbook instead
+        except (OSError, ValueError, KeyError, ImportError):
+            return None
+
+
+    def write_cache(self, df):
+        """
+        Saves the parsed data and the workbook's key. Failing to write (e.g. a read-only
+        directory or no pyarrow) is not an error, the next run just parses the workbook again.
+
+        Args:
+            df (DataFrame): Registration data from read_workbook()
+        """
+        if self.cache_path is None:
+            return
+        try:
+            # Write then rename, so another run never loads a half written file
+            df.to_feather(self.cache_path + ".tmp")
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+            self.write_key(self.source_key())
+        except (OSError, ImportError):
+            pass
+
+
+    def write_key(self, key):
+        """
+        Saves the workbook key the cache was built from.
+
+        Args:
+            key (dict): Key from source_key()
+        """
+        with open(self.cache_path + ".json.tmp", "w") as f:
+            json.dump(key, f)
+        os.replace(self.cache_path + ".json.tmp", self.cache_path + ".json")
+
+
+    def preload(self):
+        """
+        Starts loading the data on a background thread, e.g. while waiting for the user to type.
+        """
+        threading.Thread(target=self.load_data, daemon=True).start()
+
+
+    def set_window(self, years=None, months=None):
+        """
+        Limits the statistics to a window of years and/or months.
+
+        Args:
+            years (tuple(int, int)): First and last year to include, either can be None for no limit.
+                None includes every year
+            months (tuple(str, str)): First and last month to include in calendar order, e.g.
+                ("November", "February") wraps around the new year. None includes every month
+
+        Raises:
+            ValueError: A month name is not valid
+        """
+        self.window_years = tuple(years) if years is not None else None
+        if months is None:
+            self.window_months = None
+            return
+        positions = []
+        for month in months:
+            # Full names or abbreviations of at least three letters, in any case
+            month = month.strip().lower()
+            matches = [i for i, name in enumerate(month_names) if len(month) >= 3 and name.lower().startswith(month)]
+            if not matches:
+                raise ValueError(f"Months must be one of: {', '.join(month_names)}.")
+            positions.append(matches[0])
+        first, last = positions
+        self.window_months = [month_names[(first + i) % 12] for i in range((last - first) % 12 + 1)]
+
+
+    def in_window(self, year, month):
+        """
+        Checks whether a period is inside the window. Works on single values or on columns.
+
+        Args:
+            year (int or Series): Year
+            month (str or Series): Month name
+
+        Returns:
+            bool or Series[bool]: True where the period is in the window
+        """
+        inside = True
+        if self.window_years is not None:
+            first, last = self.window_years
+            if first is not None:
+                inside = inside & (year >= first)
+            if last is not None:
+                inside = inside & (year <= last)
+        if self.window_months is not None:
+            inside = inside & (month.isin(self.window_months) if hasattr(month, "isin") else month in self.window_months)
+        return inside
+
+
+    def selected_year_totals(self):
+        """
+        Gets the registrations of all breeds per year within the window, from the precomputed totals.
+
+        Returns:
+            dict: Year -> registrations, for every year of the data inside the window, in order
+        """
+        # Touching df makes sure the data, and so the totals, are loaded
+        self.df
+        if self.window_years is None and self.window_months is None:
+            return dict(sorted(self.year_totals.items()))
+        totals = {}
+        for (year, month), total in sorted(self.period_totals.items()):
+            if self.in_window(year, month):
+                totals[year] = totals.get(year, 0) + total
+        return totals
+
+
     def get_breed_data(self, breed):
         # Standardize input
         breed = breed.upper()
+        df = self.df
         # Raise error if breed not found
-        if breed not in self.df['Breed'].values:
+        if breed not in self.breed_rows:
             raise KeyError('Dog breed not found in the data. Please try again.')
-        # Filter the dataframe for only breed values
-        breed_data = self.df[self.df["Breed"] == breed]
+        # Take only the breed's rows, found when the data was loaded
+        breed_data = df.iloc[self.breed_rows[breed]]
+        # The window is applied to the breed's rows only, never the whole table
+        if self.window_years is not None or self.window_months is not None:
+            breed_data = breed_data[self.in_window(breed_data["Year"], breed_data["Month"])]
+            # No rows in the window (or an empty window) would make every percentage 0/0
+            if breed_data.empty:
+                raise KeyError(f'Dog breed not found in {self.period_name()}. Please try again.')
         return breed_data
+
+
+    def year_shares(self, breed_data):
+        """
+        Works out the percentage of each year's registrations that were the breed's, for every
+        year in the window, with one grouped sum.
+
+        Args:
+            breed_data (df): Associated data with specified breed.
+
+        Returns:
+            Series: Year -> percentage
+        """
+        import pandas as pd
+        totals = pd.Series(self.selected_year_totals(), dtype="int64")
+        breed_totals = breed_data.groupby("Year")["Total"].sum().reindex(totals.index, fill_value=0)
+        return breed_totals / totals * 100
+
+
+    def period_name(self):
+        """
+        Describes the window for printed statistics.
+
+        Returns:
+            str: e.g. "all years" or "2021-2022, March-June"
+        """
+        parts = []
+        months = (self.window_months[0], self.window_months[-1]) if self.window_months else None
+        for first, last in (self.window_years or (None, None), months or (None, None)):
+            if first is not None and first == last:
+                parts.append(str(first))
+            elif first is not None or last is not None:
+                parts.append(f"{first if first is not None else ''}-{last if last is not None else ''}")
+        return ", ".join(parts) if parts else "all years"
     
     
     def analyze_breed_data(self, breed):
@@ -85,20 +424,14 @@ class DogBreedAnalyzer:
     def print_year_registration_percentage(self, breed, breed_data):
         """
         Prints what percentage of specified breed registration compared to the total 
-        dataset for each year (2021, 2022, 2023).
+        dataset for each year in the data (within the window).
 
         Args:
             breed (str): Breed name.
             breed_data (df): Associated data with specified breed.
         """
-        # Repeat for each of the three years
-        for year in [2021, 2022, 2023]:
-            # Get year total for specified breed
-            breed_total = breed_data[breed_data["Year"] == year]["Total"].sum()
-            # Get all breeds total for specified year
-            total = self.df[self.df["Year"] == year]["Total"].sum()
-            # Calculate the percentage
-            percentage = (breed_total / (total)) * 100
+        # Percentages of every year at once
+        for year, percentage in self.year_shares(breed_data).items():
             # Print result (rounded to 6 decimal places) 
             print(f"The {breed} was {round(percentage, 6)}% of the top breeds in {year}.")
     
@@ -113,28 +446,276 @@ class DogBreedAnalyzer:
         """
         # Sum registration counts over breed dataset
         breed_total = breed_data["Total"].sum()
-        # Sum registration counts over entire data set
-        total = self.df["Total"].sum()
+        # Registration count over entire data set (within the window)
+        total = sum(self.selected_year_totals().values())
         # Calculate percentage
         percentage = (breed_total / total) * 100
         # Print result
-        print(f"The {breed} was {round(percentage, 6)}% of the top breeds across all years.")
+        print(f"The {breed} was {round(percentage, 6)}% of the top breeds across {self.period_name()}.")
 
 
     def print_popular_months(self, breed, breed_data):
-        # Get the number of times each month shows up for given breed data
-        month_frequency = breed_data["Month"].value_counts() 
+        # Get the number of times each month shows up for given breed data. Counted as strings, since
+        # a categorical's value_counts() would list ties in category order rather than in data order
+        month_frequency = breed_data["Month"].astype(str).value_counts()
         # Get only the maximum value (will also get ties)
         popular_months = month_frequency[month_frequency == month_frequency.max()]
         # Get the month name and convert to a list
         popular_months = popular_months.index.tolist()
         # Print result
         print(f"Most popular month(s) for {breed} dogs: {' '.join(popular_months)}")
-        
-def main():
+
+
+    def breed_summary(self, breed):
+        """
+        Computes the same five statistics analyze_breed_data() prints, as a dictionary.
+
+        Args:
+            breed (str): Breed name.
+
+        Raises:
+            KeyError: The breed is not in the data
+
+        Returns:
+            dict: breed, years, total, percent_<year> for each year, overall_percent and popular_months
+        """
+        breed = breed.upper()
+        breed_data = self.get_breed_data(breed)
+        summary = {"breed": breed, "years": [int(year) for year in breed_data["Year"].unique()],
+                   "total": int(breed_data["Total"].sum())}
+        for year, percentage in self.year_shares(breed_data).items():
+            summary[f"percent_{year}"] = round(float(percentage), 6)
+        total = sum(self.selected_year_totals().values())
+        summary["overall_percent"] = round(float(breed_data["Total"].sum() / total * 100), 6)
+        month_frequency = breed_data["Month"].astype(str).value_counts()
+        summary["popular_months"] = month_frequency[month_frequency == month_frequency.max()].index.tolist()
+        return summary
+
+
+    def breed_report(self):
+        """
+        Computes the breed_summary() statistics of every breed at once, with a few grouped
+        aggregations over the whole table instead of one pass per breed.
+
+        Returns:
+            DataFrame: One row per breed (in order of first appearance) with the same columns as
+                breed_summary(), years and popular_months hold lists
+        """
+        df = self.df
+        if self.window_years is not None or self.window_months is not None:
+            df = df[self.in_window(df["Year"], df["Month"])]
+        year_totals = self.selected_year_totals()
+        by_breed = df.groupby("Breed", observed=True, sort=False)
+        report = by_breed["Total"].sum().rename("total").to_frame()
+        report.index = report.index.astype(str)
+
+        # Years and months are listed in the order they first appear in each breed's rows
+        years = df[["Breed", "Year"]].drop_duplicates()
+        report.insert(0, "years", years.groupby("Breed", observed=True, sort=False)["Year"].agg(list))
+
+        # One pivot gives every breed's registrations per year
+        per_year = df.pivot_table(index="Breed", columns="Year", values="Total", aggfunc="sum", observed=True)
+        for year, total in year_totals.items():
+            breed_totals = per_year[year].reindex(report.index) if year in per_year else 0
+            report[f"percent_{year}"] = (breed_totals / total * 100).fillna(0).round(6)
+        report["overall_percent"] = (report["total"] / sum(year_totals.values()) * 100).round(6)
+
+        # Rows per breed and month, keeping the months whose count is the breed's highest (ties included)
+        counts = df.groupby(["Breed", "Month"], observed=True)["Total"].transform("size")
+        most = counts == counts.groupby(df["Breed"], observed=True).transform("max")
+        popular = df.loc[most, ["Breed", "Month"]].drop_duplicates()
+        popular["Month"] = popular["Month"].astype(str)
+        report["popular_months"] = popular.groupby("Breed", observed=True, sort=False)["Month"].agg(list)
+
+        return report.rename_axis("breed").reset_index()
+
+
+def breed_records(analyzer, breeds):
+    """
+    Generates the summary of many breeds, one per query, in order. Breeds that are not in the data
+    produce a record with an "error" instead.
+
+    Args:
+        analyzer (DogBreedAnalyzer): Analyzer with the registration data
+        breeds (iterable): Breed names
+
+    Yields:
+        dict: The query and the breed's summary (or the query and error)
+    """
+    for breed in breeds:
+        try:
+            yield {"query": breed, **analyzer.breed_summary(breed)}
+        except KeyError as e:
+            yield {"query": breed, "error": e.args[0]}
+
+
+def read_queries(queries, file_path):
+    """
+    Collects the queries given on the command line and/or in a file (one per line, "-" for stdin).
+    The file is opened straight away, so a file that cannot be read is reported before any output.
+    Mirrors read_queries() in a3/school_data.py, keep the two the same.
+
+    Args:
+        queries (list[str]): Queries given on the command line
+        file_path (str): File of queries, "-" for stdin, None for none
+
+    Raises:
+        OSError: The file cannot be opened
+
+    Returns:
+        iterator[str]: Each non-empty query
+    """
+    f = None
+    if file_path:
+        f = sys.stdin if file_path == "-" else open(file_path)
+
+    def lines():
+        yield from queries
+        if f is not None:
+            with f:
+                for line in f:
+                    if line.strip():
+                        yield line.strip()
+
+    return lines()
+
+
+def record_fields(analyzer):
+    """
+    Gets the CSV columns of the batch output, which has a percentage column per year in the window.
+
+    Args:
+        analyzer (DogBreedAnalyzer): Analyzer with the registration data
+
+    Returns:
+        list[str]: Column names
+    """
+    return (["query", "breed", "years", "total"] + [f"percent_{year}" for year in analyzer.selected_year_totals()] +
+            ["overall_percent", "popular_months", "error"])
+
+
+def write_records(records, output_format, fields, out=sys.stdout):
+    """
+    Streams records to out as JSON lines or CSV (list values joined with spaces), flushing after
+    each one so results appear as they are made.
+    Mirrors write_records() in a3/school_data.py, keep the two the same.
+
+    Args:
+        records (iterable[dict]): Records to write
+        output_format (str): "jsonl" or "csv"
+        fields (list[str]): CSV columns
+        out (file): Where to write
+
+    Returns:
+        int: Number of records that had an error
+    """
+    errors = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+    for record in records:
+        errors += "error" in record
+        if output_format == "jsonl":
+            out.write(json.dumps(record) + "\n")
+        else:
+            writer.writerow({key: " ".join(map(str, value)) if isinstance(value, list) else value
+                             for key, value in record.items()})
+        out.flush()
+    return errors
+
+
+def parse_args(argv):
+    """
+    Parses the command line.
+
+    Args:
+        argv (list[str]): Arguments after the program name
+
+    Returns:
+        Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="ENSF 692 Dogs of Calgary. Without breeds the interactive "
+                                                 "program runs; with breeds every one is answered in one batch.")
+    parser.add_argument("breeds", nargs="*", help="Dog breeds")
+    parser.add_argument("--all", action="store_true", help="Report the statistics of every breed")
+    parser.add_argument("-f", "--file", help="File with one breed per line, - for stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="Batch output format")
+    parser.add_argument("--data", default="CalgaryDogBreeds.xlsx", help="Registration workbook")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the workbook, ignoring the Feather cache")
+    parser.add_argument("--years", type=year_window, help="Years to include, e.g. 2022, 2021-2022 or 2022-")
+    parser.add_argument("--months", type=month_window, help="Months to include, e.g. May or March-June")
+    return parser.parse_args(argv)
+
+
+def year_window(text):
+    """
+    Parses a --years value.
+
+    Args:
+        text (str): A year, or first and last years joined by "-" (either may be left out)
+
+    Returns:
+        tuple(int, int): First and last year, None for no limit
+    """
+    first, _, last = text.partition("-")
+    try:
+        first = int(first) if first.strip() else None
+        last = first if "-" not in text else int(last) if last.strip() else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid year window: {text}")
+    return first, last
+
+
+def month_window(text):
+    """
+    Parses a --months value.
+
+    Args:
+        text (str): A month, or first and last months joined by "-"
+
+    Returns:
+        tuple(str, str): First and last month
+    """
+    first, _, last = text.partition("-")
+    return first, last or first
+
+
+def make_analyzer(args):
+    """
+    Creates the analyzer the command line asks for.
+
+    Args:
+        args (Namespace): Parsed command line arguments
+
+    Returns:
+        DogBreedAnalyzer: Analyzer with the window set
+    """
+    analyzer = DogBreedAnalyzer(args.data, not args.no_cache)
+    try:
+        analyzer.set_window(args.years, args.months)
+    except ValueError as e:
+        sys.exit(f"calgary_dogs.py: {e}")
+    return analyzer
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    analyzer = make_analyzer(args)
+    if args.all:
+        write_records(analyzer.breed_report().to_dict("records"), args.format, record_fields(analyzer))
+        return
+    if args.breeds or args.file:
+        # Batch mode: load once, answer every breed, stream the results
+        try:
+            queries = read_queries(args.breeds, args.file)
+        except OSError as e:
+            sys.exit(f"calgary_dogs.py: {e}")
+        errors = write_records(breed_records(analyzer, queries), args.format, record_fields(analyzer))
+        sys.exit(1 if errors else 0)
+
     print("ENSF 692 Dogs of Calgary")
-    # Create object
-    analyzer = DogBreedAnalyzer("CalgaryDogBreeds.xlsx")
+    # Read the workbook while the user is typing instead of before the prompt
+    analyzer.preload()
     # Continually ask for user input
     while True:
         try:
@@ -0,0 +1,59 @@
+# bench_parsers.py
+# Aidan MacNichol
+#
+# Benchmarks the book_parsers.py extraction engines on saved catalogue pages and checks
+# that every engine extracts exactly the same titles and prices as the original one.
+#
+# Usage: python bench_parsers.py <saved page or directory of saved pages> [repeats]
+
+import os
+import sys
+import time
+
+from book_parsers import parse_full, parsers
+
+
+def load_pages(path):
+    """
+    Reads one saved html page, or every .html file under a directory.
+
+    Args:
+        path (str): File or directory path
+
+    Returns:
+        list[bytes]: Raw html of each page
+    """
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path)
+                       for name in names if name.endswith(".html"))
+    pages = []
+    for page_path in paths:
+        with open(page_path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    pages = load_pages(sys.argv[1])
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    expected = [parse_full(page) for page in pages]
+    print(f"{len(pages)} pages, {sum(map(len, expected))} books, best of {repeats} runs")
+
+    for name, parse in parsers.items():
+        # Every engine must match the original output exactly
+        if [parse(page) for page in pages] != expected:
+            print(f"{name:>10}: output differs from the full parse!")
+            continue
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for page in pages:
+                parse(page)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>10}: {best * 1000:9.2f} ms total, {best * 1000 / len(pages):7.3f} ms/page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# bench_pricing.py
+# Aidan MacNichol
+#
+# Microbenchmark of the pricing.py engine on synthetic book tables of 10k and 1M rows.
+#
+# Usage: python bench_pricing.py [rows ...]
+
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pricing import PricingEngine
+
+# A mix of price band, title and time window rules like the ones used in the app config
+rules = [
+    {"discount": 0.5, "title": "^the ", "min_price": 40},
+    {"discount": 0.4, "start": "2024-11-29T00:00", "end": "2024-12-03T00:00"},
+    {"discount": 0.3, "max_price": 15},
+    {"discount": 0.1, "min_price": 50},
+]
+words = np.array(["The", "A", "Night", "Sharp", "Objects", "Soumission", "Light", "Attic", "Tipping", "Velvet"])
+
+
+def make_books(rows, seed=0):
+    """
+    Builds a random book table.
+
+    Args:
+        rows (int): Number of rows
+        seed (int): Random seed
+
+    Returns:
+        DataFrame: Book data with 'Titles' and 'Prices' columns
+    """
+    rng = np.random.default_rng(seed)
+    titles = pd.Series(words[rng.integers(0, len(words), rows)]).str.cat(
+        pd.Series(words[rng.integers(0, len(words), rows)]), sep=" ")
+    prices = np.round(rng.uniform(10, 60, rows), 2)
+    return pd.DataFrame({"Titles": titles, "Prices": prices})
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 1_000_000]
+    engine = PricingEngine(rules)
+    for now in (datetime(2024, 6, 1), datetime(2024, 11, 30)):
+        for rows in sizes:
+            books = make_books(rows)
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                engine.sale_prices(books, now)
+                best = min(best, time.perf_counter() - start)
+            print(f"{now:%Y-%m-%d} {rows:>9} rows: {best * 1000:9.2f} ms, {rows / best / 1e6:7.2f} M rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# book_cache.py
+# Aidan MacNichol
+#
+# In-process TTL cache for the scraped book table used by web_data_app.py.
+# Fresh entries are served directly, stale entries are served while a background thread
+# refreshes them, and a cold or expired cache only ever triggers one upstream fetch at a time.
+
+import threading
+import time
+
+
+class BookCache:
+    """
+    Caches the result of an expensive loader function (the books.toscrape.com scrape).
+
+    Variables:
+        loader (function): Zero argument function that returns the value to cache
+        ttl (float): Seconds a loaded value is considered fresh
+        stale_ttl (float): Extra seconds a value may be served stale while it is refreshed in the background
+        fingerprint (function): Optional function computing a content hash of a loaded value
+        version (int): Incremented every time a new value is loaded
+        loaded_at (float): Wall clock time (time.time()) of the last successful load, None if never loaded
+        content_hash (str): fingerprint() of the current value, computed once per load (None without fingerprint)
+    """
+
+    def __init__(self, loader, ttl=300, stale_ttl=3600, fingerprint=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fingerprint = fingerprint
+        self.version = 0
+        self.loaded_at = None
+        self.content_hash = None
+
+        self._value = None
+        self._loaded_monotonic = None
+        self._lock = threading.Lock()
+        # Event set when the in flight load (cold or background refresh) finishes (single-flight)
+        self._inflight = None
+        self._last_error = None
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+
+    def get(self):
+        """
+        Returns the cached value, loading it first if the cache is empty or fully expired.
+
+        Raises:
+            Exception: Whatever the loader raised if a blocking load failed
+
+        Returns:
+            object: Cached value returned by the loader
+        """
+        return self.get_entry()[0]
+
+
+    def get_entry(self):
+        """
+        Like get(), but also returns the content hash and load time of the value, all read together
+        under the lock so they always describe the same load (a refresh landing in between cannot
+        pair an old hash with a new value).
+
+        Raises:
+            Exception: Whatever the loader raised if a blocking load failed
+
+        Returns:
+            tuple(object, str, float): Cached value, its content_hash and its loaded_at time
+        """
+        with self._lock:
+            if self._value is not None:
+                age = time.monotonic() - self._loaded_monotonic
+                # Fresh value, serve it directly
+                if age < self.ttl:
+                    self._counters["hits"] += 1
+                    return self._entry()
+                # Stale but still usable, serve it and refresh in the background
+                if age < self.ttl + self.stale_ttl:
+                    self._counters["stale_hits"] += 1
+                    if self._inflight is None:
+                        self._inflight = threading.Event()
+                        threading.Thread(target=self._background_refresh, args=(self._inflight,),
+                                         daemon=True).start()
+                    return self._entry()
+
+            # Nothing usable: only the first caller loads, everyone else waits for the running load
+            # (which may be a background refresh started while the value was still stale)
+            self._counters["misses"] += 1
+            if self._inflight is None:
+                self._inflight = threading.Event()
+                event = self._inflight
+                leader = True
+            else:
+                event = self._inflight
+                leader = False
+
+        if leader:
+            try:
+                return self._load()
+            finally:
+                with self._lock:
+                    self._inflight = None
+                event.set()
+
+        event.wait()
+        with self._lock:
+            if self._value is None or time.monotonic() - self._loaded_monotonic >= self.ttl + self.stale_ttl:
+                raise RuntimeError("Book data could not be loaded") from self._last_error
+            return self._entry()
+
+
+    def prime(self, value, loaded_at):
+        """
+        Seeds the cache with a previously saved value (e.g. an on-disk snapshot) so it can be served
+        straight away. A value older than the TTL is treated as stale, so the first request gets it
+        immediately and triggers a background refresh.
+
+        Args:
+            value (object): Value to serve
+            loaded_at (float): Wall clock time (time.time()) the value was originally loaded
+        """
+        age = min(max(time.time() - loaded_at, 0), self.ttl)
+        content_hash = self.fingerprint(value) if self.fingerprint else None
+        with self._lock:
+            self._value = value
+            self.content_hash = content_hash
+            self._loaded_monotonic = time.monotonic() - age
+            self.loaded_at = loaded_at
+            self.version += 1
+
+
+    def invalidate(self):
+        """
+        Drops the cached value so the next call to get() loads it again.
+        """
+        with self._lock:
+            self._value = None
+            self._loaded_monotonic = None
+
+
+    def stats(self):
+        """
+        Gets a snapshot of the cache counters.
+
+        Returns:
+            dict: hits, stale_hits, misses, refreshes and errors counts plus the current version and age
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["version"] = self.version
+            if self._loaded_monotonic is None:
+                stats["age"] = None
+            else:
+                stats["age"] = round(time.monotonic() - self._loaded_monotonic, 3)
+            return stats
+
+
+    def _load(self):
+        """
+        Calls the loader and stores its result. Loader errors are counted and re-raised.
+
+        Returns:
+            tuple(object, str, float): Newly loaded value, its content_hash and its loaded_at time
+        """
+        try:
+            value = self.loader()
+        except Exception as e:
+            with self._lock:
+                self._counters["errors"] += 1
+                self._last_error = e
+            raise
+        content_hash = self.fingerprint(value) if self.fingerprint else None
+        with self._lock:
+            self._value = value
+            self.content_hash = content_hash
+            self._loaded_monotonic = time.monotonic()
+            self.loaded_at = time.time()
+            self.version += 1
+            self._last_error = None
+            return self._entry()
+
+
+    def _entry(self):
+        """
+        Gets the current value with its hash and load time. Must be called with the lock held.
+
+        Returns:
+            tuple(object, str, float): Cached value, content_hash and loaded_at
+        """
+        return self._value, self.content_hash, self.loaded_at
+
+
+    def _background_refresh(self, event):
+        """
+        Refreshes a stale value on a background thread. On failure the stale value is kept.
+
+        Args:
+            event (threading.Event): In flight event to set once the refresh finishes
+        """
+        try:
+            self._load()
+            with self._lock:
+                self._counters["refreshes"] += 1
+        except Exception:
+            # Error already counted in _load(), keep serving the stale value
+            pass
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
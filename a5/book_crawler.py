@@ -0,0 +1,130 @@
+# book_crawler.py
+# Aidan MacNichol
+#
+# Crawls every page of the books.toscrape.com catalogue for web_data_app.py.
+# The first page is used to discover how many pages there are, then the remaining pages
+# are fetched concurrently over one pooled keep-alive requests.Session.
+
+import re
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from book_parsers import get_parser
+
+
+class BookCrawler:
+    """
+    Fetches catalogue pages concurrently with a bounded thread pool.
+
+    Variables:
+        base_url (str): Url of the first catalogue page, can point at a local stand-in server
+        concurrency (int): Maximum number of pages fetched at the same time (also the connection pool size)
+        timeout (float): Per request timeout in seconds
+        parser (function): Extraction engine from book_parsers used on every page
+        timer (function): Called with a stage name ("fetch", "parse", "dataframe"), returns a context manager timing it
+        session (requests.Session): Shared session that keeps connections alive and retries failed requests
+    """
+
+    # Matches the "Page 1 of 50" pager text and the page number inside "page-2.html" links
+    page_count_pattern = re.compile(rb"Page\s+\d+\s+of\s+(\d+)")
+    page_number_pattern = re.compile(r"page-(\d+)\.html")
+    # Only the "next" pager link is needed to build the page urls
+    next_strainer = SoupStrainer("li", class_="next")
+
+    def __init__(self, base_url="http://books.toscrape.com/", concurrency=8, timeout=10, retries=3, backoff=0.5,
+                 parser="auto", timer=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.parser = get_parser(parser)
+        self.timer = timer or (lambda stage: nullcontext())
+
+        # Retry connection errors and throttling/server errors with exponential backoff
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+
+    def fetch(self, url):
+        """
+        Gets a single page.
+
+        Args:
+            url (str): Page url
+
+        Raises:
+            requests.HTTPError: Page could not be fetched after all retries
+
+        Returns:
+            bytes: Raw html of the page
+        """
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+
+    def page_urls(self, first_page):
+        """
+        Works out the urls of every page after the first one from the pager on the first page.
+
+        Args:
+            first_page (bytes): Raw html of the first page
+
+        Returns:
+            list[str]: Urls of pages 2 to N, empty if the catalogue only has one page
+        """
+        count = self.page_count_pattern.search(first_page)
+        soup = BeautifulSoup(first_page, 'html.parser', parse_only=self.next_strainer)
+        next_link = soup.find("a")
+        if count is None or next_link is None:
+            return []
+        # The next link looks like "catalogue/page-2.html", swap the number in to build the others
+        next_href = next_link.get("href")
+        if not self.page_number_pattern.search(next_href):
+            return [urljoin(self.base_url, next_href)]
+        return [urljoin(self.base_url, self.page_number_pattern.sub(f"page-{page}.html", next_href))
+                for page in range(2, int(count.group(1)) + 1)]
+
+
+    def crawl(self, all_pages=True):
+        """
+        Scrapes the catalogue into a DataFrame.
+
+        Args:
+            all_pages (bool): Follow the pager and fetch every page, otherwise only the first page
+
+        Returns:
+            DataFrame: Book data with 'Titles' and 'Prices' columns in catalogue order
+        """
+        with self.timer("fetch"):
+            first_page = self.fetch(self.base_url)
+            pages = [first_page]
+            if all_pages:
+                urls = self.page_urls(first_page)
+                # map() keeps the results in page order regardless of which fetch finishes first
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    pages.extend(pool.map(self.fetch, urls))
+
+        with self.timer("parse"):
+            books = []
+            for page in pages:
+                books.extend(self.parser(page))
+        with self.timer("dataframe"):
+            return pd.DataFrame(books, columns=['Titles','Prices'])
+
+
+    def close(self):
+        """
+        Closes the pooled connections.
+        """
+        self.session.close()
@@ -0,0 +1,101 @@
+# book_parsers.py
+# Aidan MacNichol
+#
+# Extraction engines that pull the (title, price) of every product_pod out of a catalogue page.
+# All engines return exactly the same data, they only differ in how much of the page they parse
+# and which parser backend does the work. Use get_parser() to pick one by name.
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional, the faster engines fall back to html.parser when it is not installed
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+
+def parse_full(content):
+    """
+    Original engine: parses the whole page with html.parser and searches it for product_pods.
+
+    Args:
+        content (bytes): Raw html of the page
+
+    Returns:
+        list[tuple(str, float)]: (title, price) pair for each book in page order
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    books = []
+    for book in soup.find_all(attrs={'class':'product_pod'}):
+        books.append((book.h3.a.get('title'), float(book.find('p', class_="price_color").text[1:])))
+    return books
+
+
+# Only <article class="product_pod"> subtrees are built when parsing with this strainer
+product_strainer = SoupStrainer("article", class_="product_pod")
+
+
+def parse_strained(content):
+    """
+    Parses only the product_pod subtrees, skipping the page header, sidebar and pager.
+    Uses lxml as the BeautifulSoup backend when it is installed.
+
+    Args:
+        content (bytes): Raw html of the page
+
+    Returns:
+        list[tuple(str, float)]: (title, price) pair for each book in page order
+    """
+    backend = 'html.parser' if lxml is None else 'lxml'
+    soup = BeautifulSoup(content, backend, parse_only=product_strainer)
+    books = []
+    for book in soup.find_all("article"):
+        books.append((book.h3.a.get('title'), float(book.find('p', class_="price_color").text[1:])))
+    return books
+
+
+def parse_lxml(content):
+    """
+    Parses the page with lxml directly and reads the books with XPath, no BeautifulSoup tree at all.
+
+    Args:
+        content (bytes): Raw html of the page
+
+    Returns:
+        list[tuple(str, float)]: (title, price) pair for each book in page order
+    """
+    tree = lxml.html.document_fromstring(content, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    books = []
+    for book in tree.xpath('//*[contains(concat(" ", normalize-space(@class), " "), " product_pod ")]'):
+        # get() returns a plain str, an XPath attribute result would be a "smart string" keeping a
+        # reference to the whole page tree for as long as the cached title lives
+        title = book.find('h3/a').get('title')
+        price = book.xpath('.//p[contains(concat(" ", normalize-space(@class), " "), " price_color ")]')[0].text_content()
+        books.append((title, float(price[1:])))
+    return books
+
+
+# Engine name -> parse function
+parsers = {"full": parse_full, "strained": parse_strained}
+if lxml is not None:
+    parsers["lxml"] = parse_lxml
+
+
+def get_parser(name="auto"):
+    """
+    Looks up an extraction engine by name.
+
+    Args:
+        name (str): "full", "strained", "lxml" or "auto" (fastest engine that is installed)
+
+    Raises:
+        ValueError: Unknown engine or lxml requested but not installed
+
+    Returns:
+        function: Parse function taking the raw page html
+    """
+    if name == "auto":
+        return parsers.get("lxml", parse_strained)
+    if name not in parsers:
+        raise ValueError(f"Unknown or unavailable parser '{name}', choose from: {', '.join(parsers)}")
+    return parsers[name]
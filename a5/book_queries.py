@@ -0,0 +1,106 @@
+# book_queries.py
+# Aidan MacNichol
+#
+# Column selection, filtering, paging and export of the book DataFrame for the
+# machine-readable API routes in web_data_app.py. Filters are vectorized pandas masks.
+
+import io
+
+import numpy as np
+
+# Query string filter -> (column, comparison) applied as one boolean mask
+range_filters = {
+    "min_price": ("Prices", np.greater_equal),
+    "max_price": ("Prices", np.less_equal),
+    "min_sale_price": ("Sale Price", np.greater_equal),
+    "max_sale_price": ("Sale Price", np.less_equal),
+}
+
+
+def query_books(df, args):
+    """
+    Applies the filters and column selection from a request's query string.
+
+    Args:
+        df (DataFrame): Book data with 'Titles', 'Prices' and 'Sale Price' columns
+        args (MultiDict): Query string arguments (min_price, max_price, min_sale_price, max_sale_price,
+            title (case-insensitive substring) and columns (comma separated))
+
+    Raises:
+        ValueError: Unknown column or a filter value that is not a number
+
+    Returns:
+        DataFrame: Matching rows with only the requested columns
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for name, (column, compare) in range_filters.items():
+        if name in args:
+            try:
+                value = float(args[name])
+            except ValueError:
+                raise ValueError(f"{name} must be a number.")
+            mask &= compare(df[column].to_numpy(), value)
+    if args.get("title"):
+        mask &= df["Titles"].str.contains(args["title"], case=False, regex=False).to_numpy()
+
+    columns = list(df.columns)
+    if args.get("columns"):
+        columns = args["columns"].split(",")
+        unknown = [column for column in columns if column not in df.columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Choose from: {', '.join(df.columns)}")
+    return df.loc[mask, columns]
+
+
+def paginate(df, page, per_page):
+    """
+    Gets one page of rows.
+
+    Args:
+        df (DataFrame): Rows to page through
+        page (int): Page number starting at 1
+        per_page (int): Rows per page
+
+    Returns:
+        DataFrame: Rows on the requested page (empty past the last page)
+    """
+    start = (page - 1) * per_page
+    return df.iloc[start:start + per_page]
+
+
+def csv_chunks(df, chunk_rows=1000):
+    """
+    Generates the DataFrame as CSV text a chunk of rows at a time, header first.
+
+    Args:
+        df (DataFrame): Rows to export
+        chunk_rows (int): Number of rows in each chunk
+
+    Yields:
+        str: CSV text
+    """
+    yield df.iloc[:0].to_csv(index=False)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False)
+
+
+def to_columnar(df, file_format):
+    """
+    Serializes the DataFrame as Parquet or Arrow IPC (Feather). Needs pyarrow.
+
+    Args:
+        df (DataFrame): Rows to export
+        file_format (str): "parquet" or "arrow"
+
+    Raises:
+        ImportError: pyarrow is not installed
+
+    Returns:
+        bytes: Serialized file
+    """
+    buffer = io.BytesIO()
+    if file_format == "parquet":
+        df.to_parquet(buffer, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(buffer)
+    return buffer.getvalue()
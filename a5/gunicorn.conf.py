@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+# Aidan MacNichol
+#
+# Gunicorn settings for serving web_data_app.py in production: gunicorn -c gunicorn.conf.py wsgi:app
+# Each worker process runs a pool of threads, so a request waiting on books.toscrape.com (only on a
+# cold cache, stale data is refreshed in the background) does not block the other requests.
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("THREADS", 8))
+# Keep-alive lets load balancers and repeat clients reuse connections
+keepalive = 5
+timeout = 60
+graceful_timeout = 30
+# The app is not preloaded: every worker builds its own book cache and connection pool after forking.
+# Workers still agree: /data ETags are hashes of the book content, and a worker whose cache expires
+# reuses a snapshot another worker saved within the TTL instead of scraping again
+preload_app = False
+accesslog = os.environ.get("ACCESS_LOG")
@@ -0,0 +1,78 @@
+# http_caching.py
+# Aidan MacNichol
+#
+# Helpers for HTTP conditional requests (ETag / Last-Modified -> 304) and response compression
+# used by web_data_app.py.
+
+import gzip
+
+# brotli is optional, gzip is used when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+min_compress_size = 500
+
+
+def choose_encoding(request, encodings):
+    """
+    Picks the content encoding to use for a response from the ones the client accepts.
+
+    Args:
+        request (Request): Current request
+        encodings (list[str]): Encodings the server is willing to use in order of preference ("br", "gzip")
+
+    Returns:
+        str: Chosen encoding, None to send the response uncompressed
+    """
+    for encoding in encodings:
+        if encoding == "br" and brotli is None:
+            continue
+        if request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def is_not_modified(request, etag, last_modified):
+    """
+    Checks the request's validators against the current version of a resource.
+    If-None-Match takes priority over If-Modified-Since, as required by RFC 9110.
+
+    Args:
+        request (Request): Current request
+        etag (str): Current entity tag of the resource
+        last_modified (datetime): When the resource last changed (timezone aware), None if unknown
+
+    Returns:
+        bool: True if the client's copy is still current and a 304 can be sent
+    """
+    if request.if_none_match:
+        # If-None-Match uses the weak comparison, so W/"x" (e.g. weakened by a proxy) matches "x"
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        # HTTP dates only have second precision
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def compress_response(response, encoding):
+    """
+    Compresses a buffered response body in place.
+
+    Args:
+        response (Response): Response to compress, streamed responses are left alone
+        encoding (str): "br" or "gzip"
+    """
+    response.vary.add("Accept-Encoding")
+    if response.is_streamed or response.content_encoding:
+        return
+    data = response.get_data()
+    if len(data) < min_compress_size:
+        return
+    if encoding == "br":
+        response.set_data(brotli.compress(data))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.content_encoding = encoding
@@ -0,0 +1,185 @@
+# load_test.py
+# Aidan MacNichol
+#
+# Load tests web_data_app.py in each serving mode against a local stand-in upstream (local_upstream.py)
+# and reports requests per second with p50/p99 latency for each one.
+#
+# Usage: python load_test.py <saved pages directory> [--modes dev threaded gunicorn waitress]
+#        [--path /data] [--clients 16] [--duration 10] [--cache-ttl 300]
+
+import argparse
+import http.client
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from local_upstream import start_server
+
+# Serving mode -> command line that serves the app on {port}
+modes = {
+    "dev": [sys.executable, "-m", "flask", "--app", "web_data_app", "run", "--port", "{port}", "--without-threads"],
+    "threaded": [sys.executable, "-m", "flask", "--app", "web_data_app", "run", "--port", "{port}", "--with-threads"],
+    "gunicorn": ["gunicorn", "-c", "gunicorn.conf.py", "--bind", "127.0.0.1:{port}", "wsgi:app"],
+    "waitress": ["waitress-serve", "--listen=127.0.0.1:{port}", "--threads=16", "wsgi:app"],
+}
+
+
+def free_port():
+    """
+    Finds a free local port by briefly starting a server on port 0.
+
+    Returns:
+        int: Port number
+    """
+    server = start_server(tempfile.gettempdir())
+    port = server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    return port
+
+
+def wait_until_up(port, timeout=30):
+    """
+    Waits until something is answering HTTP on the port.
+
+    Args:
+        port (int): Port to poll
+        timeout (float): Seconds to wait before giving up
+
+    Raises:
+        TimeoutError: Server did not come up in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Server on port {port} did not start")
+
+
+def run_client(port, path, stop_at, latencies, errors):
+    """
+    Sends requests back to back over one keep-alive connection until stop_at.
+
+    Args:
+        port (int): App port
+        path (str): Path to request
+        stop_at (float): time.monotonic() deadline
+        latencies (list[float]): Request latencies are appended here
+        errors (list[str]): Failures are appended here
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(str(response.status))
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def percentile(values, fraction):
+    """
+    Gets a percentile from a list of values (nearest rank).
+
+    Args:
+        values (list[float]): Sorted values
+        fraction (float): Percentile between 0 and 1
+
+    Returns:
+        float: Value at the percentile
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def load_test(mode, upstream_url, args):
+    """
+    Starts the app in one serving mode, runs the clients against it and stops it again.
+
+    Args:
+        mode (str): Key of the modes dict
+        upstream_url (str): Url of the local stand-in upstream
+        args (Namespace): Parsed command line arguments
+
+    Returns:
+        tuple(int, int, float): Completed requests, errors and elapsed seconds, None if the mode is unavailable
+    """
+    command = [part.format(port=args.port) for part in modes[mode]]
+    if shutil.which(command[0]) is None:
+        return None
+    snapshot_dir = tempfile.mkdtemp()
+    env = dict(os.environ, FLASK_BOOK_SOURCE_URL=upstream_url, FLASK_BOOK_CACHE_TTL=str(args.cache_ttl),
+               FLASK_BOOK_CACHE_STALE_TTL=str(args.cache_ttl), FLASK_BOOK_SNAPSHOT_DIR=snapshot_dir,
+               BIND=f"127.0.0.1:{args.port}")
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(args.port)
+        # One warm-up request so every mode starts with the same cache state
+        connection = http.client.HTTPConnection("127.0.0.1", args.port, timeout=30)
+        connection.request("GET", args.path)
+        connection.getresponse().read()
+        connection.close()
+
+        latencies, errors = [], []
+        start = time.monotonic()
+        stop_at = start + args.duration
+        clients = [threading.Thread(target=run_client, args=(args.port, args.path, stop_at, latencies, errors))
+                   for _ in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - start
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    latencies.sort()
+    if latencies:
+        print(f"{mode:>9}: {len(latencies) / elapsed:9.1f} req/s   p50 {percentile(latencies, 0.5) * 1000:8.2f} ms   "
+              f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms   errors {len(errors)}")
+    else:
+        print(f"{mode:>9}: no successful requests, errors {len(errors)}")
+    return len(latencies), len(errors), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test web_data_app.py serving modes.")
+    parser.add_argument("pages", help="Directory of saved books.toscrape.com pages")
+    parser.add_argument("--modes", nargs="+", choices=list(modes), default=list(modes))
+    parser.add_argument("--path", default="/data")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--cache-ttl", type=float, default=300, help="Book cache TTL (also used as the stale TTL), 0 sends every request upstream")
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+    args.port = args.port or free_port()
+
+    upstream = start_server(args.pages)
+    upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}/"
+    print(f"{args.clients} clients for {args.duration}s against {args.path}, upstream {upstream_url}")
+    for mode in args.modes:
+        if load_test(mode, upstream_url, args) is None:
+            print(f"{mode:>9}: skipped ({modes[mode][0]} not installed)")
+    upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
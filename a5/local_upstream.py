@@ -0,0 +1,53 @@
+# local_upstream.py
+# Aidan MacNichol
+#
+# Serves saved copies of books.toscrape.com pages from a local directory so the crawler
+# (and the rest of web_data_app.py) can be run and tested without touching the real site.
+#
+# Usage: python local_upstream.py <saved pages directory> [port]
+# then run the app with FLASK_BOOK_SOURCE_URL=http://127.0.0.1:<port>/
+
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """
+    Static file handler that does not log every request to the terminal.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory, port=0):
+    """
+    Starts a threaded static file server on a background thread.
+
+    Args:
+        directory (str): Directory holding the saved pages (index.html, catalogue/page-2.html, ...)
+        port (int): Port to listen on, 0 picks a free port
+
+    Returns:
+        ThreadingHTTPServer: Running server, call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    directory = sys.argv[1]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    server = start_server(directory, port)
+    print(f"Serving {directory} on http://127.0.0.1:{server.server_address[1]}/ (Press CTRL+C to quit)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# metrics.py
+# Aidan MacNichol
+#
+# Minimal thread-safe latency histograms rendered in the Prometheus text exposition format,
+# used by web_data_app.py for per-route request latency and per-stage /data timings.
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets, +Inf is added when rendering
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram with one series per combination of label values.
+
+    Variables:
+        name (str): Metric name
+        description (str): Description shown in the # HELP line
+        label_names (tuple[str]): Names of the labels each observation carries
+        buckets (tuple[float]): Bucket upper bounds in seconds
+    """
+
+    def __init__(self, name, description, label_names, buckets=default_buckets):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+
+
+    def observe(self, value, *label_values):
+        """
+        Records one observation.
+
+        Args:
+            value (float): Observed duration in seconds
+            *label_values (str): One value per label name, in order
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+
+    @contextmanager
+    def time(self, *label_values):
+        """
+        Context manager that observes how long its block took.
+
+        Args:
+            *label_values (str): One value per label name, in order
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+
+    def time_iter(self, iterable, *label_values):
+        """
+        Passes an iterable through, observing the total time spent producing its items (not the time
+        the consumer spends between items, e.g. sending a streamed response) once it is exhausted or closed.
+
+        Args:
+            iterable (iterable): Items to pass through
+            *label_values (str): One value per label name, in order
+
+        Yields:
+            object: Each item of iterable
+        """
+        iterator = iter(iterable)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.observe(elapsed, *label_values)
+
+
+    def render(self):
+        """
+        Renders every series in the Prometheus text format.
+
+        Returns:
+            list[str]: Lines of the exposition
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for label_values, values in series:
+            labels = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(self.label_names, label_values))
+            prefix = labels + "," if labels else ""
+            suffix = f"{{{labels}}}" if labels else ""
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{suffix} {values[-2]}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]}")
+        return lines
+
+
+def escape_label(value):
+    """
+    Escapes a label value for the Prometheus text format.
+
+    Args:
+        value (object): Label value
+
+    Returns:
+        str: Escaped value
+    """
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_gauges(name, description, values, metric_type="gauge"):
+    """
+    Renders plain unlabelled values (e.g. cache counters) in the Prometheus text format.
+
+    Args:
+        name (str): Metric name prefix
+        description (str): Description shown in the # HELP lines
+        values (dict): Suffix -> numeric value, None values are skipped
+        metric_type (str): "gauge" or "counter"
+
+    Returns:
+        list[str]: Lines of the exposition
+    """
+    lines = []
+    for suffix, value in values.items():
+        if value is None:
+            continue
+        lines.append(f"# HELP {name}_{suffix} {description}")
+        lines.append(f"# TYPE {name}_{suffix} {metric_type}")
+        lines.append(f"{name}_{suffix} {value}")
+    return lines
@@ -0,0 +1,155 @@
+# pricing.py
+# Aidan MacNichol
+#
+# Rule based pricing for the book table in web_data_app.py. Discount rules match books by price band,
+# title pattern and time window. Rules are compiled once and applied to the whole DataFrame as
+# vectorized masks: the first rule that matches a row decides its discount (np.select), rows that
+# no rule matches get the default discount.
+
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def to_utc(value):
+    """
+    Converts a rule or pricing time to an aware UTC datetime so aware and naive values can be compared.
+    Naive values (no UTC offset) are taken to be in the server's local time, like datetime.now().
+
+    Args:
+        value (datetime|str): Time, or an ISO 8601 string from a config file
+
+    Returns:
+        datetime: Aware time in UTC
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.astimezone(timezone.utc)
+
+
+class DiscountRule:
+    """
+    One discount rule. Every condition that is set must match for the rule to apply.
+
+    Variables:
+        discount (float): Fraction taken off the price, 0.25 = 25% off
+        min_price (float): Lowest price the rule applies to (inclusive), None for no lower bound
+        max_price (float): Highest price the rule applies to (exclusive), None for no upper bound
+        title (str): Case-insensitive regular expression searched for in the title, None for any title
+        start (datetime): When the rule starts applying (aware, UTC), None if it always has
+        end (datetime): When the rule stops applying (exclusive, aware, UTC), None if it never does
+    """
+
+    def __init__(self, discount, min_price=None, max_price=None, title=None, start=None, end=None):
+        if not 0 <= discount <= 1:
+            raise ValueError("discount must be between 0 and 1.")
+        self.discount = discount
+        self.min_price = min_price
+        self.max_price = max_price
+        self.title = title
+        # Compiled once here rather than on every request
+        self._title_pattern = re.compile(title, re.IGNORECASE) if title is not None else None
+        # Config files give times as ISO strings, with or without a UTC offset
+        self.start = to_utc(start) if start is not None else None
+        self.end = to_utc(end) if end is not None else None
+
+
+    def is_active(self, now):
+        """
+        Checks the rule's time window.
+
+        Args:
+            now (datetime): Time prices are calculated for, naive values are local time
+
+        Returns:
+            bool: True if the rule applies at that time
+        """
+        now = to_utc(now)
+        return (self.start is None or self.start <= now) and (self.end is None or now < self.end)
+
+
+    def mask(self, prices, titles):
+        """
+        Finds the rows the rule's price band and title pattern match.
+
+        Args:
+            prices (npArray): Price of every row
+            titles (Series): Title of every row
+
+        Returns:
+            npArray[bool]: True for every matching row
+        """
+        mask = np.ones(len(prices), dtype=bool)
+        if self.min_price is not None:
+            mask &= prices >= self.min_price
+        if self.max_price is not None:
+            mask &= prices < self.max_price
+        if self.title is not None:
+            mask &= titles.str.contains(self._title_pattern, regex=True, na=False).to_numpy(dtype=bool)
+        return mask
+
+
+class PricingEngine:
+    """
+    Applies an ordered list of discount rules to a book table.
+
+    Variables:
+        rules (list[DiscountRule]): Rules in priority order, the first match wins
+        default_discount (float): Discount for rows no rule matches
+    """
+
+    def __init__(self, rules=(), default_discount=0.25):
+        # Rules may be given as DiscountRule objects or as keyword dictionaries from the app config
+        self.rules = [rule if isinstance(rule, DiscountRule) else DiscountRule(**rule) for rule in rules]
+        self.default_discount = default_discount
+
+
+    def active_rules(self, now=None):
+        """
+        Gets the positions of the rules whose time window includes now. Prices only change
+        when this (or the data) changes, so it is part of the /data ETag.
+
+        Args:
+            now (datetime): Time to check, defaults to the current time
+
+        Returns:
+            tuple[int]: Positions of the active rules
+        """
+        now = to_utc(now) if now is not None else datetime.now(timezone.utc)
+        return tuple(i for i, rule in enumerate(self.rules) if rule.is_active(now))
+
+
+    def discounts(self, df, now=None):
+        """
+        Works out the discount of every row.
+
+        Args:
+            df (DataFrame): Book data with 'Titles' and 'Prices' columns
+            now (datetime): Time to price at, defaults to the current time
+
+        Returns:
+            npArray[float]: Discount fraction for each row
+        """
+        now = to_utc(now) if now is not None else datetime.now(timezone.utc)
+        prices = df["Prices"].to_numpy(dtype=float)
+        # Rules outside their time window are dropped before any row is looked at
+        active = [self.rules[i] for i in self.active_rules(now)]
+        if not active:
+            return np.full(len(prices), self.default_discount)
+        masks = [rule.mask(prices, df["Titles"]) for rule in active]
+        return np.select(masks, [rule.discount for rule in active], default=self.default_discount)
+
+
+    def sale_prices(self, df, now=None):
+        """
+        Calculates the sale price of every row.
+
+        Args:
+            df (DataFrame): Book data with 'Titles' and 'Prices' columns
+            now (datetime): Time to price at, defaults to the current time
+
+        Returns:
+            npArray[float]: Sale price for each row
+        """
+        return df["Prices"].to_numpy(dtype=float) * (1 - self.discounts(df, now))
@@ -0,0 +1,72 @@
+# sampling_profiler.py
+# Aidan MacNichol
+#
+# Low overhead sampling profiler for a single thread. A background thread periodically grabs the
+# target thread's stack with sys._current_frames() and counts identical stacks, producing
+# "folded" output that flamegraph tools (flamegraph.pl, speedscope) can read directly.
+
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread until stopped.
+
+    Variables:
+        thread_id (int): threading.get_ident() of the thread being profiled
+        interval (float): Seconds between samples
+        samples (Counter): Folded stack string -> number of times it was sampled
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    def start(self):
+        """
+        Starts sampling on a background thread.
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        """
+        Stops sampling and waits for the sampler thread to finish.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+    def folded(self):
+        """
+        Gets the samples in folded stack format, one "frame;frame;frame count" line per stack.
+
+        Returns:
+            str: Folded stacks, most sampled first
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+    def _run(self):
+        """
+        Sampling loop run on the background thread.
+        """
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            # Root first, like other folded stack output
+            self.samples[";".join(reversed(stack))] += 1
@@ -0,0 +1,343 @@
+# snapshot_store.py
+# Aidan MacNichol
+#
+# Versioned on-disk snapshots of the scraped book table for web_data_app.py, stored as Parquet.
+# Each save is diffed against the previous snapshot and only the changed rows are written as a
+# delta file. Every compact_every versions a full base snapshot is written so loading stays cheap.
+#
+# Row contents and catalogue order are stored separately: a delta holds only added, changed or
+# removed rows, and when the order of the catalogue changes (e.g. a book inserted near the front)
+# an order file lists just the row keys in their new order. So an insertion rewrites one row, not
+# every row after it.
+#
+# Files are named <version>-base.parquet, <version>-delta.parquet or <version>-order.parquet.
+# Loading the latest snapshot reads the newest base and applies the files written after it.
+#
+# Several processes (e.g. gunicorn workers) may share a directory: saves are serialized with a lock
+# file, each save starts from the newest snapshot on disk, and temporary files have unique names.
+
+import contextlib
+import os
+import re
+import time
+import uuid
+
+import pandas as pd
+
+# Rows are identified by title plus occurrence (for duplicate titles)
+key_columns = ["Titles", "_occurrence"]
+file_pattern = re.compile(r"^(\d{6})-(base|delta|order)\.parquet$")
+
+
+class SnapshotStore:
+    """
+    Stores book DataFrames as versioned Parquet snapshots in a directory.
+
+    Variables:
+        directory (str): Directory holding the snapshot files
+        compact_every (int): Number of versions after a base after which a new full base is written
+        keep_bases (int): Number of base snapshots (and the files after them) kept on disk
+        lock_timeout (float): Seconds to wait for another process's save before giving up
+        version (int): Version of the latest snapshot, 0 if there is none
+        saved_at (float): Wall clock time the latest snapshot was written, None if there is none
+    """
+
+    def __init__(self, directory, compact_every=10, keep_bases=2, lock_timeout=30):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.keep_bases = keep_bases
+        self.lock_timeout = lock_timeout
+        self.version = 0
+        self.saved_at = None
+        # Latest snapshot in stored (keyed) form and its catalogue order, used to diff the next save against
+        self._latest = None
+        self._order = None
+        self._versions_since_base = 0
+
+
+    def load_latest(self, attempts=3):
+        """
+        Loads the newest snapshot by reading the latest base file and applying the files after it.
+        If another process prunes a file while it is being read, the load starts over.
+
+        Args:
+            attempts (int): Number of times to try
+
+        Returns:
+            DataFrame: Book data with 'Titles' and 'Prices' columns, None if no snapshot has been saved
+        """
+        for attempt in range(attempts):
+            try:
+                return self._load()
+            except FileNotFoundError:
+                if attempt == attempts - 1:
+                    raise
+
+
+    def load_recent(self, max_age):
+        """
+        Loads the newest snapshot if it was saved (or confirmed unchanged) less than max_age seconds
+        ago, e.g. by another process sharing the directory.
+
+        Args:
+            max_age (float): Largest acceptable age in seconds
+
+        Returns:
+            DataFrame: Book data, None if there is no snapshot that recent
+        """
+        files = self._files()
+        try:
+            if not files or time.time() - os.path.getmtime(files[-1][2]) >= max_age:
+                return None
+        except FileNotFoundError:
+            return None
+        return self.load_latest()
+
+
+    def _load(self):
+        """
+        Reads the newest snapshot (see load_latest).
+
+        Returns:
+            DataFrame: Book data, None if no snapshot has been saved
+        """
+        files = self._files()
+        bases = [i for i, (_, kind, _) in enumerate(files) if kind == "base"]
+        if not bases:
+            return None
+
+        version, _, path = files[bases[-1]]
+        stored = pd.read_parquet(path)
+        # A base is written in catalogue order
+        order = stored[key_columns]
+        later = files[bases[-1] + 1:]
+        for version, kind, path in later:
+            if kind == "delta":
+                stored = apply_delta(stored, pd.read_parquet(path))
+            else:
+                order = pd.read_parquet(path)
+
+        self.version = version
+        self.saved_at = os.path.getmtime(path)
+        self._latest = stored
+        self._order = order
+        self._versions_since_base = len({version for version, _, _ in later})
+        return to_books(stored, order)
+
+
+    def save(self, books):
+        """
+        Saves a new scrape. Only rows that differ from the previous snapshot (and the order, if it
+        changed) are written, unless a new base snapshot is due. Nothing is written if the scrape
+        is unchanged.
+
+        Args:
+            books (DataFrame): Book data with 'Titles' and 'Prices' columns
+
+        Returns:
+            int: Version of the latest snapshot after saving
+        """
+        stored = to_stored(books)
+        order = stored[key_columns]
+        # Created on the first save rather than when the store is made, so importing the app writes nothing
+        os.makedirs(self.directory, exist_ok=True)
+        with self._locked():
+            # Another process may have saved since this one last looked
+            if self._latest is None or self._disk_version() != self.version:
+                self._load()
+
+            if self._latest is None or self._versions_since_base >= self.compact_every:
+                self._write({"base": stored})
+                self._versions_since_base = 0
+            else:
+                frames = {}
+                delta = diff(self._latest, stored)
+                if not delta.empty:
+                    frames["delta"] = delta
+                if not order.reset_index(drop=True).equals(self._order.reset_index(drop=True)):
+                    frames["order"] = order
+                if not frames:
+                    # Mark the snapshot as confirmed now, so other processes know it is current
+                    files = self._files()
+                    os.utime(files[-1][2])
+                    self.saved_at = time.time()
+                    return self.version
+                self._write(frames)
+                self._versions_since_base += 1
+            self._latest = stored
+            self._order = order
+            self._prune()
+        return self.version
+
+
+    def _write(self, frames):
+        """
+        Writes the files of the next version. Each is written to a uniquely named temporary file
+        and renamed, so readers never see a half written file and writers never share a temporary
+        file. The order file is renamed before the delta, so a delta is never seen without it.
+
+        Args:
+            frames (dict): "base", "delta" and/or "order" -> frame to write
+        """
+        version = self._disk_version() + 1
+        for kind in sorted(frames, key=["base", "order", "delta"].index):
+            path = os.path.join(self.directory, f"{version:06d}-{kind}.parquet")
+            temporary = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+            try:
+                frames[kind].to_parquet(temporary, index=False)
+                os.replace(temporary, path)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+        self.version = version
+        self.saved_at = time.time()
+
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Holds the directory's lock file, created exclusively so only one process saves at a time.
+        A lock left behind by a process that died while saving is broken once it is older than
+        lock_timeout.
+
+        Raises:
+            TimeoutError: The lock could not be taken within lock_timeout
+        """
+        path = os.path.join(self.directory, ".lock")
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                with contextlib.suppress(FileNotFoundError):
+                    if time.time() - os.path.getmtime(path) > self.lock_timeout:
+                        os.remove(path)
+                        continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for the snapshot lock {path}")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(path)
+
+
+    def _disk_version(self):
+        """
+        Gets the newest version on disk.
+
+        Returns:
+            int: Newest version, 0 if there are no snapshot files
+        """
+        files = self._files()
+        return files[-1][0] if files else 0
+
+
+    def _files(self):
+        """
+        Lists the snapshot files in version order.
+
+        Returns:
+            list[tuple(int, str, str)]: (version, "base", "delta" or "order", path) for each file
+        """
+        files = []
+        # No directory yet means nothing has been saved
+        if not os.path.isdir(self.directory):
+            return files
+        for name in os.listdir(self.directory):
+            match = file_pattern.match(name)
+            if match:
+                files.append((int(match.group(1)), match.group(2), os.path.join(self.directory, name)))
+        return sorted(files)
+
+
+    def _prune(self):
+        """
+        Deletes files older than the oldest base snapshot that is kept.
+        """
+        files = self._files()
+        bases = [version for version, kind, _ in files if kind == "base"]
+        if len(bases) <= self.keep_bases:
+            return
+        oldest_kept = bases[-self.keep_bases]
+        for version, _, path in files:
+            if version < oldest_kept:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+
+
+def to_stored(books):
+    """
+    Adds the key and deletion columns used on disk.
+
+    Args:
+        books (DataFrame): Book data with 'Titles' and 'Prices' columns
+
+    Returns:
+        DataFrame: Stored form of the books, in catalogue order
+    """
+    stored = books[["Titles", "Prices"]].reset_index(drop=True)
+    # Duplicate titles are told apart by how many times the title appeared before
+    stored["_occurrence"] = stored.groupby("Titles").cumcount()
+    stored["_deleted"] = False
+    return stored
+
+
+def to_books(stored, order):
+    """
+    Converts stored rows back to the book table in catalogue order.
+
+    Args:
+        stored (DataFrame): Stored form of the books
+        order (DataFrame): Keys of the rows in catalogue order
+
+    Returns:
+        DataFrame: Book data with 'Titles' and 'Prices' columns
+    """
+    rows = stored.set_index(key_columns)
+    return rows.reindex(pd.MultiIndex.from_frame(order)).reset_index()[["Titles", "Prices"]]
+
+
+def diff(old, new):
+    """
+    Finds the rows that were added, changed or removed between two snapshots. Where rows are in
+    the catalogue does not matter here, order is stored separately.
+
+    Args:
+        old (DataFrame): Previous snapshot in stored form
+        new (DataFrame): New snapshot in stored form
+
+    Returns:
+        DataFrame: Added and changed rows from new, plus removed rows from old flagged with _deleted
+    """
+    merged = new.merge(old[key_columns + ["Prices"]], on=key_columns, how="outer", suffixes=("", "_old"),
+                       indicator=True)
+    changed = (merged["_merge"] == "left_only") | ((merged["_merge"] == "both") &
+                                                   (merged["Prices"] != merged["Prices_old"]))
+    removed = merged["_merge"] == "right_only"
+
+    upserts = merged.loc[changed, new.columns]
+    deletes = merged.loc[removed, key_columns].assign(Prices=merged.loc[removed, "Prices_old"], _deleted=True)
+    delta = pd.concat([upserts, deletes[new.columns]], ignore_index=True)
+    delta["_occurrence"] = delta["_occurrence"].astype("int64")
+    delta["_deleted"] = delta["_deleted"].astype(bool)
+    return delta
+
+
+def apply_delta(stored, delta):
+    """
+    Applies a delta on top of a snapshot.
+
+    Args:
+        stored (DataFrame): Snapshot in stored form
+        delta (DataFrame): Delta written by diff()
+
+    Returns:
+        DataFrame: Updated snapshot in stored form
+    """
+    # Drop every row the delta touches, then add back the ones that were not deleted
+    touched = pd.MultiIndex.from_frame(delta[key_columns])
+    keep = ~pd.MultiIndex.from_frame(stored[key_columns]).isin(touched)
+    return pd.concat([stored[keep], delta[~delta["_deleted"]]], ignore_index=True)
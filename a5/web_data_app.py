@@ -6,21 +6,96 @@
 # Detailed specifications are provided via the Assignment 5 README file.
 
 
-import pandas as pd     # needed for data manipulation
 
-from flask import Flask, render_template    # needed for web app
+from flask import Flask, render_template, jsonify, request, stream_template, stream_with_context, abort, g    # needed for web app
 
-from bs4 import BeautifulSoup               # needed for web scraping
-import requests
-
-from datetime import datetime               # needed for time/regular expressions
+from datetime import datetime, timezone     # needed for time/regular expressions
 import re
+import zlib                                 # needed for hashing query strings into ETags
+import hashlib                              # needed for hashing the books into ETags
+import os
+import threading
+import time                                 # needed for request timing
+
+from book_cache import BookCache            # needed for caching the scraped books
+from book_crawler import BookCrawler        # needed for web scraping
+from snapshot_store import SnapshotStore    # needed for saving scrapes to disk
+from pricing import PricingEngine           # needed for sale prices
+from http_caching import choose_encoding, compress_response, is_not_modified    # needed for HTTP caching
+from book_queries import query_books, paginate, csv_chunks, to_columnar        # needed for the data API
+from metrics import Histogram, render_gauges                                   # needed for /metrics
+from sampling_profiler import SamplingProfiler                                 # needed for per request profiling
 
 
 ###
 # Initialize our FLASK application object from the Flask class like so:
 app = Flask(__name__)
 
+# Cache settings (seconds), can be overridden with environment variables e.g. FLASK_BOOK_CACHE_TTL=60
+app.config.update(BOOK_CACHE_TTL=300, BOOK_CACHE_STALE_TTL=3600)
+# Crawler settings, BOOK_CRAWL_ALL_PAGES follows the pager instead of only scraping the first page
+app.config.update(BOOK_SOURCE_URL="http://books.toscrape.com/", BOOK_CRAWL_ALL_PAGES=False, BOOK_CRAWL_CONCURRENCY=8,
+                  BOOK_REQUEST_TIMEOUT=10, BOOK_REQUEST_RETRIES=3, BOOK_RETRY_BACKOFF=0.5)
+# Extraction engine from book_parsers.py ("auto" picks the fastest one installed)
+app.config.update(BOOK_PARSER="auto")
+# Stream the /data table in chunks of rows instead of rendering it in one piece (also enabled per request with ?stream=1)
+app.config.update(BOOK_STREAM=False, BOOK_STREAM_CHUNK_ROWS=200)
+# Cache-Control header sent by each route (by endpoint name) and the encodings /data may be compressed with
+app.config.update(CACHE_CONTROL={"index": "public, max-age=86400", "learn": "public, max-age=86400",
+                                 "hello_there": "no-cache", "book_data": "public, max-age=60", "cache_stats": "no-store",
+                                 "books_json": "public, max-age=60", "books_csv": "public, max-age=60",
+                                 "books_columnar": "public, max-age=60", "metrics": "no-store"},
+                  COMPRESS_ENDPOINTS=["book_data", "books_json"], COMPRESS_ENCODINGS=["br", "gzip"])
+# Default and maximum page size of the JSON API
+app.config.update(API_PER_PAGE=50, API_MAX_PER_PAGE=1000)
+# Directory of on-disk scrape snapshots (None disables them), BOOK_OFFLINE serves the latest snapshot without scraping
+app.config.update(BOOK_SNAPSHOT_DIR="snapshots", BOOK_SNAPSHOT_COMPACT_EVERY=10, BOOK_OFFLINE=False)
+# Discount rules for the 'Sale Price' column (see pricing.py), e.g.
+# [{"discount": 0.5, "min_price": 50}, {"discount": 0.4, "title": "^the ", "start": "2024-11-29T00:00", "end": "2024-12-03T00:00"}]
+# The first matching rule wins, other books get PRICING_DEFAULT_DISCOUNT
+app.config.update(PRICING_RULES=[], PRICING_DEFAULT_DISCOUNT=0.25)
+# Requests sending PROFILE_HEADER with a value equal to PROFILE_TOKEN are profiled (disabled while the token is None)
+# and their folded stacks written to PROFILE_DIR
+app.config.update(PROFILE_HEADER="X-Profile", PROFILE_TOKEN=None, PROFILE_DIR="profiles", PROFILE_INTERVAL=0.001)
+app.config.from_prefixed_env()
+
+# Latency of every request by route, and of each stage of building the /data page
+request_latency = Histogram("http_request_duration_seconds", "Request latency by route.", ("route", "method", "status"))
+book_stage_latency = Histogram("book_data_stage_seconds", "Time spent in each stage of building the book data.", ("stage",))
+
+
+@app.before_request
+def start_request_timer():
+    """
+    Records when the request started and starts the sampling profiler if the request asked for it.
+    """
+    g.request_start = time.perf_counter()
+    token = app.config["PROFILE_TOKEN"]
+    if token is not None and request.headers.get(app.config["PROFILE_HEADER"]) == str(token):
+        g.profiler = SamplingProfiler(threading.get_ident(), app.config["PROFILE_INTERVAL"])
+        g.profiler.start()
+
+
+@app.after_request
+def record_request_latency(response):
+    """
+    Observes the request latency and saves the profile of profiled requests. Registered first so it runs
+    after every other after_request hook and includes their time.
+    """
+    rule = request.url_rule.rule if request.url_rule else "unmatched"
+    request_latency.observe(time.perf_counter() - g.request_start, rule, request.method, response.status_code)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+        os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+        path = os.path.join(app.config["PROFILE_DIR"], f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint}-{id(profiler):x}.folded")
+        with open(path, "w") as f:
+            f.write(profiler.folded())
+        response.headers["X-Profile-File"] = path
+    return response
+
+
 @app.route("/")
 def index():
     """
@@ -59,37 +134,330 @@ def hello_there(name):
     return content
 
 
-@app.route("/data")
-def book_data():
+# One crawler (and connection pool) shared by every scrape
+book_crawler = BookCrawler(app.config["BOOK_SOURCE_URL"], concurrency=app.config["BOOK_CRAWL_CONCURRENCY"],
+                           timeout=app.config["BOOK_REQUEST_TIMEOUT"], retries=app.config["BOOK_REQUEST_RETRIES"],
+                           backoff=app.config["BOOK_RETRY_BACKOFF"], parser=app.config["BOOK_PARSER"],
+                           timer=book_stage_latency.time)
+
+
+# Rules are compiled once at startup
+pricing_engine = PricingEngine(app.config["PRICING_RULES"], app.config["PRICING_DEFAULT_DISCOUNT"])
+
+# Every scrape is saved so a restarted process (or an offline one) can serve books straight away
+book_snapshots = None
+if app.config["BOOK_SNAPSHOT_DIR"]:
+    book_snapshots = SnapshotStore(app.config["BOOK_SNAPSHOT_DIR"], compact_every=app.config["BOOK_SNAPSHOT_COMPACT_EVERY"])
+
+
+def scrape_books():
     """
-    Now let's take what we learned about Pandas and scrap some data from the internet!
+    Scrapes the title and price of every book on books.toscrape.com (first page only unless
+    BOOK_CRAWL_ALL_PAGES is set) and saves it as a snapshot. In offline mode the latest snapshot
+    is returned instead.
+
+    Raises:
+        RuntimeError: Offline mode without any saved snapshot
+
+    Returns:
+        DataFrame: Book data with 'Titles' and 'Prices' columns
     """
+    if app.config["BOOK_OFFLINE"]:
+        books = book_snapshots.load_latest() if book_snapshots else None
+        if books is None:
+            raise RuntimeError(f"Offline mode needs a snapshot in {app.config['BOOK_SNAPSHOT_DIR']}")
+        return books
 
     # Web scraping can be against the Terms of Use. 
     # Always check to make sure that you are web scraping legally and ethically.
     # The following site was specifically created to practice web scraping.
-    source = requests.get("http://books.toscrape.com/")
-    soup = BeautifulSoup(source.content, 'html.parser')     # Use BeautifulSoup to parse the website html code
-    book_results = soup.find_all(attrs={'class':'product_pod'})  # By inspecting the site, we know books = product_pod class
+    if book_snapshots is not None:
+        # Another worker process may have scraped moments ago: reuse its snapshot instead of fetching again
+        try:
+            books = book_snapshots.load_recent(app.config["BOOK_CACHE_TTL"])
+        except (ImportError, OSError, ValueError) as e:
+            app.logger.warning("Could not load book snapshot: %s", e)
+            books = None
+        if books is not None:
+            return books
+    books = book_crawler.crawl(all_pages=app.config["BOOK_CRAWL_ALL_PAGES"])
+    if book_snapshots is not None:
+        try:
+            book_snapshots.save(books)
+        except (ImportError, OSError, ValueError) as e:
+            # A failed save should never fail the request, the scrape itself worked
+            app.logger.warning("Could not save book snapshot: %s", e)
+    return books
+
 
-    titles = []
-    prices = []
+# Scraped books are shared between requests and refreshed in the background once stale
+def books_fingerprint(books):
+    """
+    Hashes the content of a book table. Every worker process gets the same hash for the same
+    books, so ETags built from it validate whichever worker answers.
 
-    # For each book listed on the page, get the title and the price from inside in the html data
-    for book in book_results:
-        titles.append(book.h3.a.get('title'))
-        prices.append(float(book.find('p', class_="price_color").text[1:]))
+    Args:
+        books (DataFrame): Book data
 
-    # Create a DataFrame using the two lists
-    book_data = pd.DataFrame(list(zip(titles, prices)), columns=['Titles','Prices'])   
-    
-    # Calculate 25% discount and add new 'Sale Price' column 
-    book_data['Sale Price'] = book_data['Prices'] * 0.75
+    Returns:
+        str: Hex digest of the table's csv form
+    """
+    return hashlib.blake2b(books.to_csv(index=False).encode(), digest_size=12).hexdigest()
+
+
+book_cache = BookCache(scrape_books, ttl=app.config["BOOK_CACHE_TTL"], stale_ttl=app.config["BOOK_CACHE_STALE_TTL"],
+                       fingerprint=books_fingerprint)
+
+# Start warm from the latest snapshot if there is one
+if book_snapshots is not None:
+    try:
+        saved_books = book_snapshots.load_latest()
+    # No Parquet engine, an unreadable file or a damaged snapshot (pyarrow errors are ValueErrors):
+    # start cold rather than failing the worker
+    except (ImportError, OSError, ValueError) as e:
+        app.logger.warning("Could not load book snapshot: %s", e)
+        saved_books = None
+    if saved_books is not None:
+        book_cache.prime(saved_books, book_snapshots.saved_at)
+
+
+@app.route("/data")
+def book_data():
+    """
+    Now let's take what we learned about Pandas and scrap some data from the internet!
+    """
+    # The page only changes when the cached books do, so clients can revalidate against the content hash
+    # One read of the cache per request: the validators and the body always come from the same load
+    books, content_hash, loaded_at = book_cache.get_entry()
+    etag, last_modified = book_data_validators(content_hash, loaded_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    book_data = priced_books(books)
     
     print(book_data)        # Print to the terminal as confirmation - only we can see this
 
-    # Format and print the DataFrame using the html template provided in the templates subdirectory
-    return render_template('template.html',  tables=[book_data.to_html(classes='data')], titles=book_data.columns.values)
+    # Large tables are sent a chunk of rows at a time so the first bytes go out straight away
+    if request.args.get("stream", app.config["BOOK_STREAM"]) not in (False, "0", "false"):
+        chunks = table_row_chunks(book_data, app.config["BOOK_STREAM_CHUNK_ROWS"])
+        # Rendering happens while the response is sent, so only the time spent producing it counts
+        page = stream_template('stream_template.html', columns=book_data.columns.values, row_chunks=chunks)
+        response = app.response_class(stream_with_context(book_stage_latency.time_iter(page, "render")))
+    else:
+        # Format and print the DataFrame using the html template provided in the templates subdirectory
+        with book_stage_latency.time("render"):
+            response = app.make_response(render_template('template.html',  tables=[book_data.to_html(classes='data')],
+                                                         titles=book_data.columns.values))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def priced_books(books):
+    """
+    Gets a copy of the cached books with the sale price added.
+
+    Args:
+        books (DataFrame): Cached book data from book_cache.get_entry()
+
+    Returns:
+        DataFrame: Book data with 'Titles', 'Prices' and 'Sale Price' columns
+    """
+    # Copy so the cached table is never modified by a request
+    book_data = books.copy()
+    # Apply the discount rules (25% off by default) and add new 'Sale Price' column 
+    with book_stage_latency.time("discount"):
+        book_data['Sale Price'] = pricing_engine.sale_prices(book_data)
+    return book_data
+
+
+def not_modified(etag, last_modified):
+    """
+    Builds an empty 304 Not Modified response carrying the current validators.
+
+    Args:
+        etag (str): Current entity tag
+        last_modified (datetime): Last modified time
+
+    Returns:
+        Response: 304 response
+    """
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def book_data_validators(content_hash, loaded_at):
+    """
+    Builds the ETag and Last-Modified values of the /data page for the current request.
+    The ETag is derived from content: a hash of the cached books, the active pricing rules, the query string
+    and the negotiated encoding. It does not depend on which worker process loaded the books or when.
+
+    Args:
+        content_hash (str): Hash of the cached books, from book_cache.get_entry()
+        loaded_at (float): Time the cached books were loaded, from book_cache.get_entry()
+
+    Returns:
+        tuple(str, datetime): ETag and last modified time of the cached books
+    """
+    encoding = choose_encoding(request, app.config["COMPRESS_ENCODINGS"]) or "identity"
+    pricing = zlib.crc32(repr(pricing_engine.active_rules()).encode())
+    etag = (f"books-{content_hash}-{pricing:08x}-"
+            f"{zlib.crc32(request.query_string):08x}-{encoding}")
+    return etag, datetime.fromtimestamp(loaded_at, timezone.utc)
+
+
+def table_row_chunks(df, chunk_rows):
+    """
+    Generates the html table rows of a DataFrame a chunk at a time. Each chunk is rendered by
+    DataFrame.to_html(), which formats whole columns at once (e.g. every float of a column gets
+    the same number of decimals), so the rows look like the non-streamed page. The number of
+    decimals is decided per chunk rather than over the whole column.
+
+    Args:
+        df (DataFrame): Table to render
+        chunk_rows (int): Number of rows in each chunk
+
+    Yields:
+        str: Html for the next chunk_rows rows
+    """
+    for start in range(0, len(df), chunk_rows):
+        html = df.iloc[start:start + chunk_rows].to_html(header=False)
+        # Keep only the rows, the template writes the table and its header
+        yield html.partition("<tbody>\n")[2].rpartition("  </tbody>")[0]
+
+
+def api_books(books):
+    """
+    Gets the books filtered and trimmed to the columns requested in the query string.
+    Aborts with 400 if the query string is invalid.
+
+    Args:
+        books (DataFrame): Cached book data from book_cache.get_entry()
+
+    Returns:
+        DataFrame: Matching books
+    """
+    try:
+        return query_books(priced_books(books), request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+@app.route("/api/books.json")
+def books_json():
+    """
+    Serves a page of the book data as JSON. Supports page, per_page, columns, title and
+    min/max_price (or min/max_sale_price) query arguments.
+    """
+    # One read of the cache per request: the validators and the body always come from the same load
+    books, content_hash, loaded_at = book_cache.get_entry()
+    etag, last_modified = book_data_validators(content_hash, loaded_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    books = api_books(books)
+    page = request.args.get("page", 1, type=int)
+    per_page = min(request.args.get("per_page", app.config["API_PER_PAGE"], type=int), app.config["API_MAX_PER_PAGE"])
+    if page < 1 or per_page < 1:
+        abort(400, description="page and per_page must be positive.")
+    response = jsonify(page=page, per_page=per_page, total=len(books),
+                       books=paginate(books, page, per_page).to_dict(orient="records"))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+@app.route("/api/books.csv")
+def books_csv():
+    """
+    Streams the filtered book data as CSV. Accepts the same filters as /api/books.json (without paging).
+    """
+    # One read of the cache per request: the validators and the body always come from the same load
+    books, content_hash, loaded_at = book_cache.get_entry()
+    etag, last_modified = book_data_validators(content_hash, loaded_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response = app.response_class(csv_chunks(api_books(books)), mimetype="text/csv")
+    response.headers["Content-Disposition"] = "attachment; filename=books.csv"
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+@app.route("/api/books.<any(parquet, arrow):file_format>")
+def books_columnar(file_format):
+    """
+    Serves the filtered book data as a Parquet or Arrow (Feather) download. Needs pyarrow installed.
+    """
+    # One read of the cache per request: the validators and the body always come from the same load
+    books, content_hash, loaded_at = book_cache.get_entry()
+    etag, last_modified = book_data_validators(content_hash, loaded_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    try:
+        data = to_columnar(api_books(books), file_format)
+    except ImportError:
+        abort(501, description="pyarrow is not installed on this server.")
+    mimetype = "application/vnd.apache.parquet" if file_format == "parquet" else "application/vnd.apache.arrow.file"
+    response = app.response_class(data, mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=books.{file_format}"
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+@app.route("/cache")
+def cache_stats():
+    """
+    Shows the book cache hit/miss/refresh counters as JSON so caching can be checked under load.
+    """
+    return jsonify(book_cache.stats())
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    Exposes request latency, /data stage timings and book cache counters in the Prometheus text format.
+    """
+    stats = book_cache.stats()
+    lines = request_latency.render() + book_stage_latency.render()
+    lines += render_gauges("book_cache", "Book cache counter.",
+                           {f"{name}_total": stats[name] for name in ("hits", "stale_hits", "misses", "refreshes", "errors")},
+                           metric_type="counter")
+    lines += render_gauges("book_cache", "Book cache state.", {"version": stats["version"], "age_seconds": stats["age"]})
+    return app.response_class("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@app.after_request
+def add_cache_headers(response):
+    """
+    Adds the configured Cache-Control header, an ETag for routes that did not set one, answers
+    If-None-Match with 304 and compresses the routes listed in COMPRESS_ENDPOINTS. Error responses
+    are sent with no-store so a shared cache never keeps a 400 or 502 for the route's max-age.
+    """
+    if "Cache-Control" not in response.headers:
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            cache_control = app.config["CACHE_CONTROL"].get(request.endpoint)
+            if cache_control:
+                response.headers["Cache-Control"] = cache_control
+        else:
+            response.headers["Cache-Control"] = "no-store"
+
+    if request.method not in ("GET", "HEAD") or response.status_code != 200 or response.is_streamed:
+        return response
+    if request.endpoint in app.config["COMPRESS_ENDPOINTS"]:
+        encoding = choose_encoding(request, app.config["COMPRESS_ENCODINGS"])
+        if encoding:
+            compress_response(response, encoding)
+    # Static routes get a hash of their body as the ETag
+    if "ETag" not in response.headers:
+        response.add_etag()
+    return response.make_conditional(request)
+
 
 @app.route("/learn")
 def learn():
@@ -0,0 +1,28 @@
+# wsgi.py
+# Aidan MacNichol
+#
+# Production entry point for web_data_app.py. Point a WSGI server at wsgi:app, for example:
+#   gunicorn -c gunicorn.conf.py wsgi:app        (Linux/Mac, multi-process + threads)
+#   waitress-serve --threads=16 wsgi:app         (Windows or single process)
+#   python wsgi.py                               (waitress if installed, otherwise the threaded Flask server)
+
+import os
+
+from web_data_app import app
+
+
+def main():
+    host = os.environ.get("HOST", "127.0.0.1")
+    port = int(os.environ.get("PORT", 8000))
+    threads = int(os.environ.get("THREADS", 16))
+    try:
+        from waitress import serve
+    except ImportError:
+        # Fall back to the development server, but at least handle requests concurrently
+        app.run(host=host, port=port, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# bench_startup.py
+# Aidan MacNichol
+#
+# Cold start benchmark for the terminal tools. For each tool it measures, in fresh interpreters:
+#   * import time of the tool's module, from python -X importtime
+#   * time until the first prompt is printed
+#   * time for a complete run answering the prompt with a sample query
+# Results can be appended to a csv file to track startup time across changes.
+#
+# Usage: python bench_startup.py [--runs 5] [--history startup_history.csv]
+
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+root = os.path.dirname(os.path.abspath(__file__))
+
+# Tool name -> (directory, module, prompt text, sample answer)
+tools = {
+    "school_data": ("a3", "school_data", "Please enter the high school name or school code", "1224"),
+    "calgary_dogs": ("a4", "calgary_dogs", "Please enter a dog breed", "Airedale Terr"),
+}
+
+
+def import_time(directory, module):
+    """
+    Gets the cumulative import time of a module from python -X importtime.
+
+    Args:
+        directory (str): Directory to run in
+        module (str): Module name
+
+    Returns:
+        float: Import time in seconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=directory,
+                            capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"No importtime line for {module}")
+
+
+def run_tool(directory, module, prompt, answer):
+    """
+    Runs a tool's script in a fresh interpreter, answering its first prompt.
+
+    Args:
+        directory (str): Directory to run in
+        module (str): Module name (module.py is run)
+        prompt (str): Text of the first prompt
+        answer (str): Answer sent once the prompt appears
+
+    Returns:
+        tuple(float, float): Seconds until the prompt appeared and seconds until the tool exited
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", f"{module}.py"], cwd=directory, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    seen = b""
+    # The prompt has no newline after it, so read byte by byte until it shows up
+    while prompt.encode() not in seen:
+        byte = process.stdout.read(1)
+        if not byte:
+            raise RuntimeError(f"{module} exited before prompting")
+        seen += byte
+    to_prompt = time.perf_counter() - start
+    process.communicate(answer.encode() + b"\n")
+    return to_prompt, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark for the terminal tools.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tools", nargs="+", choices=list(tools), default=list(tools))
+    parser.add_argument("--history", help="csv file the median results are appended to")
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.tools:
+        directory, module, prompt, answer = tools[name]
+        directory = os.path.join(root, directory)
+        imports, prompts, totals = [], [], []
+        for _ in range(args.runs):
+            imports.append(import_time(directory, module))
+            to_prompt, total = run_tool(directory, module, prompt, answer)
+            prompts.append(to_prompt)
+            totals.append(total)
+        row = {"tool": name, "import_ms": statistics.median(imports) * 1000,
+               "to_prompt_ms": statistics.median(prompts) * 1000, "total_ms": statistics.median(totals) * 1000}
+        rows.append(row)
+        print(f"{name:>13}: import {row['import_ms']:8.1f} ms   first prompt {row['to_prompt_ms']:8.1f} ms   "
+              f"full run {row['total_ms']:8.1f} ms   (median of {args.runs})")
+
+    if args.history:
+        new_file = not os.path.exists(args.history)
+        with open(args.history, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["date", "tool", "import_ms", "to_prompt_ms", "total_ms"])
+            if new_file:
+                writer.writeheader()
+            for row in rows:
+                writer.writerow({"date": datetime.now().isoformat(timespec="seconds"), **row})
+
+
+if __name__ == '__main__':
+    main()